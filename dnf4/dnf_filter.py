@@ -1,7 +1,7 @@
-import hawkey
 import dnf.subject
 
 from base import DnfBase
+from nevra import split_nevra
 
 
 class DnfExample(DnfBase):
@@ -17,11 +17,11 @@ class DnfExample(DnfBase):
         # subj = dnf.subject.Subject(key)
         # qa = subj.get_best_query(self.sack, with_provides=False)
         # qa = qa.available()
-        nevra = hawkey.split_nevra(key)
+        nevra = split_nevra(key)
         name = nevra.name
         version = nevra.version
         release = nevra.release
-        epoch = nevra.epoch
+        epoch = int(nevra.epoch or 0)
         arch = nevra.arch
         print(f"{name=} {version=}  {release=} {epoch=}, {arch=}")
 
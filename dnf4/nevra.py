@@ -0,0 +1,50 @@
+"""
+Pure python NEVRA parsing, the part of yumex/nevra.py used by dnf_filter.py
+
+The scripts run with their own directory first in sys.path, where the yumex
+package is the installed application (without nevra), so it is kept here.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+CACHE_SIZE = 131072
+
+
+class NEVRA(NamedTuple):
+    name: str
+    epoch: str
+    version: str
+    release: str
+    arch: str
+
+
+class NEVR(NamedTuple):
+    name: str
+    epoch: str
+    version: str
+    release: str
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_nevr(nevr: str) -> NEVR:
+    """split name-[epoch:]version-release, epoch is "" when not in the string"""
+    rest, _, release = nevr.rpartition("-")
+    name, _, version = rest.rpartition("-")
+    epoch, sep, version_only = version.partition(":")
+    if sep:
+        version = version_only
+    else:
+        epoch = ""
+    if not name or not version or not release:
+        raise ValueError(f"Not a valid NEVR: {nevr}")
+    return NEVR(name, epoch, version, release)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_nevra(nevra: str) -> NEVRA:
+    """split name-[epoch:]version-release.arch, epoch is "" when not in the string"""
+    nevr, sep, arch = nevra.rpartition(".")
+    if not sep or not arch or nevr.count("-") < 2:
+        raise ValueError(f"Not a valid NEVRA: {nevra}")
+    return NEVRA(*split_nevr(nevr), arch)
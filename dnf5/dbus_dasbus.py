@@ -14,6 +14,8 @@ from dasbus.typing import get_native, get_variant
 from dasbus.unix import GLibClientUnix
 from gi.repository import GLib
 
+from variant_rows import VariantRows, call_variant
+
 # Constants
 SYSTEM_BUS = SystemMessageBus()
 DNFDBUS_NAMESPACE = ("org", "rpm", "dnf", "v0")
@@ -143,12 +145,13 @@ class Dnf5DBusClient:
         )
         return get_native(repos)
 
-    def package_list(self, *args, **kwargs) -> list[list[str]]:
+    def package_list(self, *args, **kwargs) -> VariantRows:
         """call the org.rpm.dnf.v0.rpm.Repo list method
 
         *args is package patterns to match
         **kwargs can contain other options like package_attrs, repo or scope
 
+        returns a lazy list of the packages (use to_native() to get python dicts)
         """
         package_attrs = kwargs.pop("package_attrs", ["nevra"])
         options = {}
@@ -162,9 +165,16 @@ class Dnf5DBusClient:
         # limit packages to one of “all”, “installed”, “available”, “upgrades”, “upgradable”
         if "scope" in kwargs:
             options["scope"] = get_variant(str, kwargs.pop("scope"))
-        # get and async partial function
-        get_list = self._async_method("list", self.session_rpm)
-        result = get_list(options)
+        # the reply is kept as one GLib.Variant, the rows are decoded when used
+        reply = call_variant(
+            SYSTEM_BUS.connection,
+            DNFDBUS.service_name,
+            self.session_path,
+            "org.rpm.dnf.v0.rpm.Rpm",
+            "list",
+            GLib.Variant("(a{sv})", (options,)),
+        )
+        # aa{sv}
         # [{
         #   "id": GLib.Variant(),
         #   "nevra": GLib.Variant("s", nevra),
@@ -172,8 +182,7 @@ class Dnf5DBusClient:
         #   },
         #   {....},
         # ]
-
-        return get_native(result)
+        return VariantRows(reply.get_child_value(0))
 
     def advisory_list(self, *args, **kwargs):
         logger.debug(f"\n --> args: {args} kwargs: {kwargs}")
@@ -20,6 +20,7 @@
 This is an example how to use `list_fd()` method of dnf5daemon-server Rpm interface.
 """
 
+import codecs
 import json
 import os
 import select
@@ -52,20 +53,23 @@ def package_list_fd(iface_rpm, options):
 
     # decoder that will be used to parse incomming data
     parser = json.JSONDecoder()
+    # incremental UTF-8 decoder, keeps multibyte chars split by the buffer size
+    utf8 = codecs.getincrementaldecoder("utf-8")()
 
     # prepare for polling
     poller = select.poll()
     poller.register(pipe_r, select.POLLIN)
     # wait for data 10 secs at most
     timeout = 10000
-    # 64k is a typical size of a pipe
-    buffer_size = 65536
+    # 64k is a typical size of a pipe, the buffer is reused for every read
+    buffer = bytearray(65536)
 
+    # remaining raw data (data after the last record boundary)
+    raw_data = bytearray()
     # remaining string to parse (can contain unfinished json from previous run)
     to_parse = ""
-    # remaining raw data (i.e. data before UTF decoding)
-    raw_data = b""
-    while True:
+    eof = False
+    while not eof:
         # wait for data
         polled_event = poller.poll(timeout)
         if not polled_event:
@@ -75,42 +79,45 @@ def package_list_fd(iface_rpm, options):
         # we know there is only one fd registered in poller
         descriptor, event = polled_event[0]
         # read a chunk of data
-        buffer = os.read(descriptor, buffer_size)
-        if not buffer:
+        length = os.readv(descriptor, [buffer])
+        if length:
+            raw_data += memoryview(buffer)[:length]
+            # only decode up to the last record boundary (newline), the rest
+            # stays in raw_data until the next chunk arrives
+            end = raw_data.rfind(b"\n") + 1
+            if not end:
+                continue
+        else:
             # end of file
-            break
-
-        raw_data += buffer
-        try:
-            to_parse += raw_data.decode()
-            # decode successful, clear remaining raw data
-            raw_data = b""
-        except UnicodeDecodeError:
-            # Buffer size split data in the middle of multibyte UTF character.
-            # Need to read another chunk of data.
-            continue
-
-        # parse JSON objects from the string
-        while to_parse:
+            eof = True
+            end = len(raw_data)
+        to_parse += utf8.decode(bytes(raw_data[:end]), final=eof)
+        # deleting from the front of a bytearray doesn't copy the remaining data
+        del raw_data[:end]
+
+        # parse JSON objects from the string, walking an index through it
+        # instead of slicing the remaining string after every object
+        pos = 0
+        while True:
+            # skip all chars till begin of next JSON objects (new lines mostly)
+            json_obj_start = to_parse.find("{", pos)
+            if json_obj_start < 0:
+                pos = len(to_parse)
+                break
             try:
-                # skip all chars till begin of next JSON objects (new lines mostly)
-                json_obj_start = to_parse.find("{")
-                if json_obj_start < 0:
-                    break
-                obj, end = parser.raw_decode(to_parse[json_obj_start:])
-                yield obj
-                to_parse = to_parse[(json_obj_start + end) :]
+                obj, pos = parser.raw_decode(to_parse, json_obj_start)
             except json.decoder.JSONDecodeError:
-                # this is just example which assumes that every decode error
-                # means the data are incomplete (buffer size split the json
-                # object in the middle). So the handler does not do anything
-                # just break the parsing cycle and continue polling.
+                # the object is incomplete (the record was split without a
+                # newline), keep it and continue polling.
+                pos = json_obj_start
                 break
+            yield obj
+        to_parse = to_parse[pos:]
 
     # finally close read end of the pipe
     os.close(pipe_r)
 
-    # non-empty raw_data here means the raw_data.decode() failed
+    # non-empty raw_data here means there was no data after a timeout
     if raw_data:
         raise Exception("Failed to decode part of received data.")
 
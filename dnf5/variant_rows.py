@@ -0,0 +1,165 @@
+"""
+Lazy views of the aa{sv} replies from dnf5daemon (like Rpm.list)
+
+get_native() converts every field of every package to python types, before
+the caller has looked at a single row. VariantRows keeps the reply as one
+GLib.Variant and decodes a row, and a field in the row, the first time it is
+used (the serialized variant has offset tables, so getting a child value is
+cheap). Decoded fields are cached. column() decodes one field of all rows in
+one pass, for sorting.
+
+    reply = call_variant(connection, bus_name, session_path, iface, "list", params)
+    pkgs = VariantRows(reply.get_child_value(0))
+    for pkg in pkgs.sorted("nevra"):
+        print(pkg["nevra"])
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from gi.repository import Gio, GLib
+
+
+def call_variant(
+    connection: Gio.DBusConnection,
+    bus_name: str,
+    object_path: str,
+    interface: str,
+    method: str,
+    parameters: GLib.Variant,
+    timeout: int = GLib.MAXINT,
+) -> GLib.Variant:
+    """call a D-Bus method and return the reply (the tuple of out args) as a GLib.Variant
+
+    a main loop is run until the reply is there, like AsyncDbusCaller.
+    The dasbus proxies unwrap the reply, so they cannot be used here.
+    """
+    main_loop = GLib.MainLoop()
+    data = {}
+
+    def callback(conn, result):
+        try:
+            data["reply"] = conn.call_finish(result)
+        except GLib.Error as e:
+            data["error"] = e
+        main_loop.quit()
+
+    connection.call(
+        bus_name, object_path, interface, method, parameters, None, Gio.DBusCallFlags.NONE, timeout, None, callback
+    )
+    main_loop.run()
+    if "error" in data:
+        raise data["error"]
+    return data["reply"]
+
+
+def _entry_value(entry: GLib.Variant) -> Any:
+    """unpack the value of a {sv} dict entry"""
+    return entry.get_child_value(1).get_variant().unpack()
+
+
+def _entry_key(row: GLib.Variant, ndx: int) -> str:
+    """the key of child ndx in a a{sv} row"""
+    return row.get_child_value(ndx).get_child_value(0).get_string()
+
+
+def _find(row: GLib.Variant, key: str, hint: int = None) -> int | None:
+    """the child number of key in a a{sv} row, hint is tried first"""
+    if hint is not None and hint < row.n_children() and _entry_key(row, hint) == key:
+        return hint
+    for ndx in range(row.n_children()):
+        if _entry_key(row, ndx) == key:
+            return ndx
+    return None
+
+
+class VariantRow(Mapping):
+    """read-only dict view of a a{sv} variant, the values are unpacked when used"""
+
+    __slots__ = ("variant", "_index", "_values")
+
+    def __init__(self, variant: GLib.Variant) -> None:
+        self.variant = variant
+        # key -> child number, made the first time a key is looked up
+        self._index: dict[str, int] = None
+        self._values: dict[str, Any] = {}
+
+    def _keys(self) -> dict[str, int]:
+        if self._index is None:
+            self._index = {_entry_key(self.variant, ndx): ndx for ndx in range(self.variant.n_children())}
+        return self._index
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = _entry_value(self.variant.get_child_value(self._keys()[key]))
+        return value
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return self.variant.n_children()
+
+    def __repr__(self) -> str:
+        return f"VariantRow({self.variant.print_(False)})"
+
+
+class VariantRows(Sequence):
+    """read-only list view of a aa{sv} variant, the rows are VariantRow's made when used"""
+
+    def __init__(self, variant: GLib.Variant) -> None:
+        self.variant = variant
+        self._rows: list[VariantRow] = [None] * variant.n_children()
+        self._columns: dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, ndx):
+        if isinstance(ndx, slice):
+            return [self[i] for i in range(*ndx.indices(len(self)))]
+        # raises IndexError and makes negative indexes positive
+        ndx = range(len(self))[ndx]
+        row = self._rows[ndx]
+        if row is None:
+            row = self._rows[ndx] = VariantRow(self.variant.get_child_value(ndx))
+        return row
+
+    def column(self, key: str, default: Any = None) -> list:
+        """the key value of all rows (default for rows without key)
+
+        all rows normally has the same keys in the same order, so the position
+        of the key in the previous row is tried first, and the row views and
+        their key index are not made.
+        """
+        if key in self._columns:
+            return self._columns[key]
+        values = []
+        pos = None
+        for ndx in range(len(self)):
+            row = self._rows[ndx]
+            if row is not None and key in row._values:
+                values.append(row._values[key])
+                continue
+            child = self.variant.get_child_value(ndx)
+            found = _find(child, key, pos)
+            if found is None:
+                values.append(default)
+            else:
+                pos = found
+                values.append(_entry_value(child.get_child_value(pos)))
+        self._columns[key] = values
+        return values
+
+    def sorted(self, key: str, reverse: bool = False) -> list[VariantRow]:
+        """the rows sorted by the key value"""
+        column = self.column(key)
+        order = sorted(range(len(column)), key=column.__getitem__, reverse=reverse)
+        return [self[ndx] for ndx in order]
+
+    def to_native(self) -> list[dict]:
+        """convert all rows to python dicts (like get_native)"""
+        return self.variant.unpack()
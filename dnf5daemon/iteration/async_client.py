@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from functools import partial
+
+import dbus
+
+from client import Dnf5DbusClient, _set_future_exception, _set_future_result
+from result_cache import INSTALLED
+from transports import ADVISORY_ATTRS, CALL_TIMEOUT, list_options, to_dbus
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDnf5Client(Dnf5DbusClient):
+    """Dnf5DbusClient with asyncio methods for the D-Bus calls
+
+    repo_list, package_list, advisory_list, resolve and do_transaction return
+    awaitables, each call is backed by a future on the running asyncio loop
+    (the GLibEventLoopPolicy loop), set from the D-Bus reply handler. There is
+    no nested main loop, so many calls can be in flight at the same time:
+
+        repos, advisories, updates = await asyncio.gather(
+            client.repo_list(), client.advisory_list(), client.package_list("*", scope="upgrades")
+        )
+
+    The D-Bus errors are raised, instead of returned like the AsyncCaller calls.
+
+    Upgrading the session closes it, with the calls in flight on it, so every
+    method needs a full session, it is opened (or upgraded) before the call is
+    issued, never while other calls are running.
+    """
+
+    def _call(self, proxy, method: str, *args) -> asyncio.Future:
+        """call a D-Bus method and return a future for the reply"""
+        future = asyncio.get_running_loop().create_future()
+        logger.debug(f"DBUS: {proxy.object_path}.{method}()")
+        getattr(proxy, method)(
+            *args,
+            reply_handler=partial(_set_future_result, future),
+            error_handler=partial(_set_future_exception, future),
+            timeout=CALL_TIMEOUT,
+        )
+        return future
+
+    async def repo_list(self, repo_attrs=None, enable_disable="all") -> list:
+        self._ensure_session("full")
+        if repo_attrs is None:
+            repo_attrs = ["name", "enabled", "priority"]
+        options = {"repo_attrs": dbus.Array(repo_attrs), "enable_disable": enable_disable}
+        return await self._call(self.session_repo, "list", options)
+
+    async def package_list(self, *args, **kwargs) -> list:
+        """*args and **kwargs are the same as for Dnf5DbusClient.package_list"""
+        self._ensure_session("full")
+        options = list_options(*args, **kwargs)
+        return await self._call(self.session_rpm, "list", to_dbus(options))
+
+    async def advisory_list(self, *args, **kwargs) -> list:
+        """*args are the packages the advisories must contain"""
+        self._ensure_session("full")
+        options = {
+            "advisory_attrs": kwargs.pop("advisor_attrs", ADVISORY_ATTRS),
+            "contains_pkgs": list(args),
+            "availability": "all",
+        }
+        return await self._call(self.session_advisory, "list", to_dbus(options))
+
+    async def resolve(self, options: dict = None) -> tuple:
+        """return (transaction items, result)"""
+        self._ensure_session("full")
+        return await self._call(self.session_goal, "resolve", dbus.Dictionary(options or {}))
+
+    async def do_transaction(self, options: dict = None):
+        self._ensure_session("full")
+        options = dict(options or {})
+        options.setdefault("comment", "Yum Extender Transaction")
+        try:
+            return await self._call(self.session_goal, "do_transaction", options)
+        finally:
+            self.invalidate_results(INSTALLED)
@@ -0,0 +1,105 @@
+import heapq
+from bisect import bisect_left, insort
+
+
+class NameCompleter:
+    """Prefix completion for package names (and provides)
+
+    The names are kept in a sorted, deduplicated list of lower case keys, the
+    names starting with a prefix are found with bisect and the top N of them
+    are returned, installed and popular packages first. Package names rank
+    before provides, and shorter names before longer ones.
+    """
+
+    def __init__(self, popularity: dict[str, int] = None) -> None:
+        # sorted lower case keys
+        self._keys: list[str] = []
+        # key -> name as shown
+        self._names: dict[str, str] = {}
+        self._installed: set[str] = set()
+        # keys only known as a provide
+        self._provides: set[str] = set()
+        # key -> popularity, higher is more popular (like number of installs)
+        self.popularity: dict[str, int] = popularity or {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._names
+
+    @classmethod
+    def build(cls, records, with_provides: bool = False, popularity: dict[str, int] = None) -> "NameCompleter":
+        """build from list_fd records with name, is_installed (and provides)"""
+        completer = cls(popularity)
+        names = completer._names
+        installed = completer._installed
+        provides = completer._provides
+        for record in records:
+            name = record["name"]
+            key = name.lower()
+            names[key] = name
+            provides.discard(key)
+            if record.get("is_installed"):
+                installed.add(key)
+            if with_provides:
+                for provide in record.get("provides", []):
+                    # "python3dist(dnf) = 4.18" -> "python3dist(dnf)"
+                    provide = provide.split(" ", 1)[0]
+                    provide_key = provide.lower()
+                    if provide_key not in names:
+                        names[provide_key] = provide
+                        provides.add(provide_key)
+        completer._keys = sorted(names)
+        return completer
+
+    def add(self, name: str, installed: bool = False, provide: bool = False) -> None:
+        """add a name, like after a transaction installed a new package"""
+        key = name.lower()
+        if key not in self._names:
+            insort(self._keys, key)
+            if provide:
+                self._provides.add(key)
+        if not provide:
+            self._provides.discard(key)
+        self._names[key] = name
+        self.set_installed(name, installed)
+
+    def remove(self, name: str) -> None:
+        """remove a name, like when the package is not available anymore"""
+        key = name.lower()
+        if self._names.pop(key, None) is None:
+            return
+        ndx = bisect_left(self._keys, key)
+        del self._keys[ndx]
+        self._installed.discard(key)
+        self._provides.discard(key)
+
+    def set_installed(self, name: str, installed: bool = True) -> None:
+        """update the installed state, like after a transaction"""
+        key = name.lower()
+        if installed:
+            self._installed.add(key)
+        else:
+            self._installed.discard(key)
+
+    def complete(self, prefix: str, limit: int = 10) -> list[str]:
+        """return the best limit names starting with prefix (case insensitive)"""
+        prefix = prefix.lower()
+        keys = self._keys
+        start = bisect_left(keys, prefix)
+        # all keys starting with prefix sorts before prefix + the highest char
+        end = bisect_left(keys, prefix + "\U0010ffff", start)
+        installed = self._installed
+        provides = self._provides
+        popularity = self.popularity
+
+        def rank(key: str) -> tuple:
+            return key not in installed, -popularity.get(key, 0), key in provides, len(key), key
+
+        matches = keys[start:end]
+        if len(matches) > limit:
+            matches = heapq.nsmallest(limit, matches, key=rank)
+        else:
+            matches.sort(key=rank)
+        return [self._names[key] for key in matches]
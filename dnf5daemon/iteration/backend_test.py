@@ -16,10 +16,10 @@ def main():
     number_interation = 10
     client = Dnf5DbusClient()
     client.open_session()
+    installed = client.refresh_installed_delta().added
+    logger.info(f"Number of installed packages : {len(installed)}")
     for i in range(number_interation):
         print(f"Interation : {i + 1}")
-        installed = list(client.package_list_fd("*", package_attrs=["full_nevra"], scope="installed"))
-        logger.info(f"Number of installed packages : {len(installed)}")
         pkg = client.package_list_fd("0xffff")[0]
         nevra = pkg["nevra"]
         logger.info(f"--> Installing {nevra}")
@@ -30,19 +30,19 @@ def main():
         print(list(res))
         rc = client.do_transaction()
         logger.info(f"tranaction complete (rc={rc})")
-        client.session_base.reset()
-        installed = list(client.package_list_fd("*", package_attrs=["full_nevra"], scope="installed"))
-        logger.info(f"Number of installed packages : {len(installed)}")
+        client.reset()
+        logger.info(f"Installed packages changed : {client.refresh_installed_delta(res[0])}")
         pkg = client.package_list_fd("0xffff")[0]
         nevra = pkg["nevra"]
         logger.info(f"--> Removing {nevra}")
         logger.debug(f"DBUS: {client.session_rpm.object_path}.install()")
         client.session_goal.reset()
         client.session_rpm.remove(dbus.Array([nevra]), dbus.Dictionary({}))
-        rc = client.resolve()
+        res, err = client.resolve()
         rc = client.do_transaction()
         logger.info(f"tranaction complete (rc={rc})")
-        client.session_base.reset()
+        client.reset()
+        logger.info(f"Installed packages changed : {client.refresh_installed_delta(res[0])}")
     client.close_session()
 
 
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for the list_fd() stream decoding
+
+Feeds a synthetic list_fd() payload to the decoder in pipe sized chunks and
+prints the time per record. The JsonStreamDecoder should show a flat per record
+cost, the old decoder re-slices the remaining string after every record.
+
+No dnf5daemon is needed, run: python3 bench_jsonstream.py
+"""
+
+import json
+from timeit import default_timer as timer
+
+from jsonstream import JsonStreamDecoder
+
+# 64k is a typical size of a pipe
+BUFFER_SIZE = 65536
+
+
+def make_payload(records: int) -> bytes:
+    """make a payload like list_fd() writes it, one JSON object per line"""
+    lines = []
+    for i in range(records):
+        pkg = {
+            "name": f"package-{i}",
+            "arch": "x86_64",
+            "repo_id": "fedora",
+            "evr": f"{i % 7}:1.{i}-1.fc41",
+            "install_size": i * 1024,
+            # a multibyte char, so the buffer size will split some of them
+            "summary": f"Summary for package {i} – with a non-ascii char",
+        }
+        lines.append(json.dumps(pkg, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def chunks(payload: bytes):
+    view = memoryview(payload)
+    for ndx in range(0, len(payload), BUFFER_SIZE):
+        yield view[ndx : ndx + BUFFER_SIZE]
+
+
+def decode_legacy(payload: bytes) -> int:
+    """the decoding loop used by _list_fd() before the JsonStreamDecoder"""
+    parser = json.JSONDecoder()
+    to_parse = ""
+    raw_data = b""
+    count = 0
+    for buffer in chunks(payload):
+        raw_data += buffer
+        try:
+            to_parse += raw_data.decode()
+            raw_data = b""
+        except UnicodeDecodeError:
+            continue
+        while to_parse:
+            try:
+                json_obj_start = to_parse.find("{")
+                if json_obj_start < 0:
+                    break
+                obj, end = parser.raw_decode(to_parse[json_obj_start:])
+                count += 1
+                to_parse = to_parse[(json_obj_start + end) :]
+            except json.decoder.JSONDecodeError:
+                break
+    return count
+
+
+def decode_stream(payload: bytes) -> int:
+    decoder = JsonStreamDecoder()
+    count = 0
+    for buffer in chunks(payload):
+        count += len(decoder.feed(buffer))
+    count += len(decoder.close())
+    return count
+
+
+def bench(func, payload: bytes, records: int) -> None:
+    t1 = timer()
+    count = func(payload)
+    t2 = timer()
+    assert count == records, f"{func.__name__} decoded {count} of {records} records"
+    print(f"{func.__name__:15} {records:>8} records in {(t2 - t1):7.3f}s : {(t2 - t1) / records * 1e6:6.2f}µs/record")
+
+
+if __name__ == "__main__":
+    for records in (1_000, 10_000, 50_000, 100_000, 500_000):
+        payload = make_payload(records)
+        print(f"payload: {len(payload) / 1024 / 1024:.1f} MB")
+        bench(decode_stream, payload, records)
+        bench(decode_legacy, payload, records)
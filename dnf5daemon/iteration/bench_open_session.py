@@ -0,0 +1,58 @@
+"""
+Benchmark for opening a dnf5daemon session
+
+Compares opening a session and making the first call, with a remote object
+and introspection for each of the seven session interfaces (the old way), and
+with the lazy, introspection-free proxies of Dnf5DbusClient.
+
+dnf5daemon-server is needed, run: python3 bench_open_session.py
+"""
+
+from timeit import default_timer as timer
+
+import dbus
+from client import Dnf5DbusClient
+from transports import (
+    DNFDAEMON_BUS_NAME,
+    IFACE_ADVISORY,
+    IFACE_BASE,
+    IFACE_GOAL,
+    IFACE_GROUP,
+    IFACE_OFFLINE,
+    IFACE_REPO,
+    IFACE_RPM,
+)
+
+ROUNDS = 10
+INTERFACES = [IFACE_REPO, IFACE_RPM, IFACE_GOAL, IFACE_BASE, IFACE_ADVISORY, IFACE_GROUP, IFACE_OFFLINE]
+# no repos are loaded, so the time is spend in D-Bus and not in the daemon
+OPTIONS = {"load_system_repo": False, "load_available_repos": False}
+
+
+def eager(client: Dnf5DbusClient) -> float:
+    t1 = timer()
+    session = client.iface_session.open_session(OPTIONS)
+    proxies = {
+        iface: dbus.Interface(client.bus.get_object(DNFDAEMON_BUS_NAME, session), dbus_interface=iface)
+        for iface in INTERFACES
+    }
+    proxies[IFACE_GOAL].reset()
+    t2 = timer()
+    client.iface_session.close_session(session)
+    return t2 - t1
+
+
+def lazy(client: Dnf5DbusClient) -> float:
+    t1 = timer()
+    client.open_session(OPTIONS, profile="minimal")
+    client.session_goal.reset()
+    t2 = timer()
+    client.close_session()
+    return t2 - t1
+
+
+if __name__ == "__main__":
+    client = Dnf5DbusClient(use_cache=False)
+    for name, func in (("eager, introspected", eager), ("lazy, no introspection", lazy)):
+        times = sorted(func(client) for _ in range(ROUNDS))
+        print(f"{name:24} : median {times[ROUNDS // 2] * 1000:7.2f}ms  best {times[0] * 1000:7.2f}ms")
@@ -0,0 +1,75 @@
+"""
+Benchmark for the SearchIndex
+
+Builds the index for 70k synthetic packages and times search-as-you-type
+queries, every prefix of the query is searched like when typing it.
+
+No dnf5daemon is needed, run: python3 bench_search_index.py
+"""
+
+import random
+import tempfile
+from pathlib import Path
+from timeit import default_timer as timer
+
+from search_index import SearchIndex
+
+PACKAGES = 70_000
+VOCABULARY = 20_000
+QUERIES = ["python3 devel", "gtk", "lib xml", "kernel", "qwerty"]
+
+
+def random_words(rnd: random.Random, number: int) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rnd.choice(letters) for _ in range(rnd.randint(3, 10))) for _ in range(number)]
+
+
+def make_words(number: int) -> list[str]:
+    """make the vocabulary, the most used words first"""
+    rnd = random.Random(42)
+    # the stop words (the, and, for ...) are in most descriptions
+    words = random_words(rnd, 50)
+    words.extend(["python3", "devel", "gtk", "lib", "xml", "kernel", "library", "tools", "plugin"])
+    words.extend(random_words(rnd, number - len(words)))
+    return words
+
+
+def make_records(number: int) -> list[dict]:
+    rnd = random.Random(42)
+    words = make_words(VOCABULARY)
+    # the common words are used a lot more than the rest (like in real text)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    records = []
+    for i in range(number):
+        name = "-".join(rnd.choices(words[:2000], k=rnd.randint(1, 3)))
+        summary = " ".join(rnd.choices(words, weights, k=6))
+        description = " ".join(rnd.choices(words, weights, k=40))
+        records.append({"name": f"{name}{i}", "summary": summary, "description": description})
+    return records
+
+
+if __name__ == "__main__":
+    records = make_records(PACKAGES)
+    t1 = timer()
+    index = SearchIndex.build(records)
+    t2 = timer()
+    print(f"build : {len(index)} packages in {(t2 - t1):.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "search-index.bin"
+        t1 = timer()
+        index.save(path, {})
+        t2 = timer()
+        revisions, index = SearchIndex.load(path)
+        t3 = timer()
+        print(f"save : {(t2 - t1):.2f}s load : {(t3 - t2):.2f}s ({path.stat().st_size / 1024 / 1024:.1f} MB)")
+
+    for query in QUERIES:
+        slowest = 0.0
+        for ndx in range(1, len(query) + 1):
+            t1 = timer()
+            rows = index.search(query[:ndx], limit=20)
+            slowest = max(slowest, timer() - t1)
+        print(f"{query!r:16} : {len(rows):3} results, slowest keystroke {slowest * 1000:6.2f}ms")
+        for row in rows[:3]:
+            print(f"   {index.names[row]}")
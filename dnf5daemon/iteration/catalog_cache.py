@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import os
+import zlib
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# bump when the snapshot format changes, old snapshots are ignored
+CACHE_VERSION = 1
+# max. size of all snapshots on disk
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return Path(cache_home) / "yumex" / "catalog"
+
+
+def options_key(options: dict) -> str:
+    """make a stable key from a list_fd options dict
+
+    dbus types are subclasses of the python types, so they will be converted
+    to the plain json types
+    """
+    data = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class CatalogCache:
+    """Persistent on-disk snapshots of package_list_fd results
+
+    A snapshot is stored for each options dict, together with the metadata
+    revisions of the repositories it was made from. The packages are stored
+    column wise (the attribute names only once) as zlib compressed json.
+
+    The least recently used snapshots are removed, when the total size is
+    bigger than max_bytes.
+    """
+
+    def __init__(self, cache_dir: Path = None, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, options: dict) -> Path:
+        return self.cache_dir / f"{options_key(options)}.json.z"
+
+    def load(self, options: dict) -> tuple[dict, list[dict]] | None:
+        """return (revisions, packages) stored for options or None if there is no snapshot"""
+        path = self._path(options)
+        try:
+            data = json.loads(zlib.decompress(path.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"catalog cache: ignoring broken snapshot {path} ({e})")
+            return None
+        if data.get("version") != CACHE_VERSION:
+            return None
+        # mark the snapshot as recently used
+        os.utime(path)
+        attrs = data["attrs"]
+        if attrs is None:
+            packages = data["rows"]
+        else:
+            packages = [dict(zip(attrs, row)) for row in data["rows"]]
+        logger.debug(f"catalog cache: loaded {len(packages)} packages from {path}")
+        return data["revisions"], packages
+
+    def store(self, options: dict, revisions: dict, packages: list[dict]) -> None:
+        """store a snapshot of packages for options"""
+        attrs = list(packages[0]) if packages else []
+        if all(list(pkg) == attrs for pkg in packages):
+            rows = [list(pkg.values()) for pkg in packages]
+        else:
+            # the packages don't have the same attributes, store them as they are
+            attrs = None
+            rows = packages
+        data = {
+            "version": CACHE_VERSION,
+            "revisions": revisions,
+            "attrs": attrs,
+            "rows": rows,
+        }
+        blob = zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode(), 1)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(options)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(blob)
+        os.replace(tmp_path, path)
+        logger.debug(f"catalog cache: stored {len(packages)} packages in {path} ({len(blob)} bytes)")
+        self._evict()
+
+    def clear(self) -> None:
+        """remove all snapshots"""
+        for path in self.cache_dir.glob("*.json.z"):
+            path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """remove the least recently used snapshots until the cache fits in max_bytes"""
+        snapshots = []
+        for path in self.cache_dir.glob("*.json.z"):
+            stat = path.stat()
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in snapshots)
+        # the newest snapshot is always kept
+        for _, size, path in sorted(snapshots)[:-1]:
+            if total <= self.max_bytes:
+                break
+            logger.debug(f"catalog cache: evicting {path}")
+            path.unlink(missing_ok=True)
+            total -= size
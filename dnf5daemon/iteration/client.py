@@ -1,45 +1,93 @@
-import json
+import asyncio
 import logging
 import os
-import select
+import sqlite3
+import threading
+import time
 from functools import partial
+from pathlib import Path
 from typing import Any
 
 import dbus
 from dbus.mainloop.glib import DBusGMainLoop
 from gi.repository import GLib  # type: ignore
 
+from autocomplete import NameCompleter
+from catalog_cache import CatalogCache, options_key
+from installed_delta import ChangeSet, merge_diff, patch_sorted, transaction_delta
+from jsonstream import READ_SIZE, JsonStreamDecoder, read_chunk, read_pipes
+from list_router import LIST_FD, ListRouter
+from repo_metadata import available_packages
+from result_cache import AVAILABLE, INSTALLED, ResultCache, result_dependencies
+from rpmdb import RPMDB_PATH, installed_packages
+from search_index import SearchIndex
+from singleflight import SingleFlight
+from transports import (
+    DNFDAEMON_OBJECT_PATH,
+    IFACE_ADVISORY,
+    IFACE_BASE,
+    IFACE_GOAL,
+    IFACE_GROUP,
+    IFACE_OFFLINE,
+    IFACE_REPO,
+    IFACE_RPM,
+    IFACE_SESSION_MANAGER,
+    DbusPythonTransport,
+    from_dbus,
+    list_options,
+    to_dbus,
+)
+from trigram_index import TrigramIndex
 from yumex.utils import dbus_exception
 from yumex.utils.exceptions import YumexException
 
 DBusGMainLoop(set_as_default=True)
 
-DNFDAEMON_BUS_NAME = "org.rpm.dnf.v0"
-DNFDAEMON_OBJECT_PATH = "/" + DNFDAEMON_BUS_NAME.replace(".", "/")
-
-IFACE_SESSION_MANAGER = "{}.SessionManager".format(DNFDAEMON_BUS_NAME)
-IFACE_REPO = "{}.rpm.Repo".format(DNFDAEMON_BUS_NAME)
-IFACE_RPM = "{}.rpm.Rpm".format(DNFDAEMON_BUS_NAME)
-IFACE_GOAL = "{}.Goal".format(DNFDAEMON_BUS_NAME)
-IFACE_BASE = "{}.Base".format(DNFDAEMON_BUS_NAME)
-IFACE_GROUP = "{}.comps.Group".format(DNFDAEMON_BUS_NAME)
-IFACE_ADVISORY = "{}.Advisory".format(DNFDAEMON_BUS_NAME)
-IFACE_OFFLINE = "{}.Offline".format(DNFDAEMON_BUS_NAME)
+# open_session options for the session profiles, from the cheapest to the full session.
+# minimal loads no repos (offline status, clean), system-only only the installed packages
+SESSION_PROFILES = {
+    "minimal": {"load_system_repo": False, "load_available_repos": False},
+    "system-only": {"load_available_repos": False},
+    "full": {},
+}
+PROFILE_RANK = {profile: rank for rank, profile in enumerate(SESSION_PROFILES)}
+
+# methods of the session interfaces, that add packages to the goal of the session (Goal.reset clears it)
+GOAL_METHODS = {
+    IFACE_RPM: {"install", "upgrade", "remove", "downgrade", "reinstall", "distro_sync", "system_upgrade"},
+    IFACE_GROUP: {"install", "remove", "upgrade"},
+    IFACE_GOAL: {"reset"},
+}
+# methods of the session interfaces, that change the query results: method -> what the results depend on
+INVALIDATING_METHODS = {
+    IFACE_REPO: {"enable": (AVAILABLE,), "disable": (AVAILABLE,)},
+}
+
+# search index file in the catalog cache directory
+SEARCH_INDEX_FILE = "search-index.bin"
+# learned list/list_fd routing history in the catalog cache directory
+LIST_ROUTER_FILE = "list-router.json"
 
 logger = logging.getLogger(__name__)
 
 
-# async call handler class
+# async call handler class, use one for each call (the state is per call)
 class AsyncCaller:
     def __init__(self) -> None:
         self.res = None
         self.err = None
         self.loop = None
+        self.on_result = None
+
+    def _done(self) -> None:
+        if self.on_result is not None:
+            self.on_result((self.res, self.err))
+        self.loop.quit()
 
     def error_handler(self, e) -> None:
         logger.error(e)
         self.err = e
-        self.loop.quit()
+        self._done()
 
     def reply_handler(self, *args) -> None:
         if len(args) > 1:
@@ -47,12 +95,17 @@ class AsyncCaller:
         else:
             if args:
                 self.res = args[0]
-        self.loop.quit()
+        self._done()
+
+    def call(self, mth, *args, on_result=None, **kwargs) -> None | Any:
+        """call mth and run a main loop until the reply is there, return (result, error)
 
-    def call(self, mth, *args, **kwargs) -> None | Any:
+        on_result is called with (result, error) from the main loop, when the reply is there
+        """
         self.loop = GLib.MainLoop()
         self.res = None
         self.err = None
+        self.on_result = on_result
         mth(
             *args,
             **kwargs,
@@ -63,52 +116,155 @@ class AsyncCaller:
         return self.res, self.err
 
 
+def _set_future_result(future: asyncio.Future, *args) -> None:
+    """D-Bus reply handler, that sets the result of an asyncio future"""
+    if not future.done():
+        future.set_result(args[0] if len(args) == 1 else args)
+
+
+def _set_future_exception(future: asyncio.Future, e) -> None:
+    """D-Bus error handler, that sets the exception of an asyncio future"""
+    if not future.done():
+        future.set_exception(e)
+
+
+def _scope_profile(options: dict) -> str:
+    """the cheapest session profile, that can list the packages for the list options"""
+    return "system-only" if options.get("scope") == "installed" else "full"
+
+
+def _copy_result(result):
+    """a copy of a query result (a list of dicts or an AsyncCaller (result, error)), the caller can change
+
+    the cached and shared results are never handed out, the rows are copied (not their values).
+    """
+    if isinstance(result, tuple):
+        return tuple(_copy_result(item) for item in result)
+    if isinstance(result, list):
+        return [row.copy() if isinstance(row, dict) else row for row in result]
+    return result
+
+
+def _call_invalidating(client: "Dnf5DbusClient", dependencies: tuple[str], method, *args, **kwargs):
+    """call method, then drop the cached results depending on dependencies"""
+    try:
+        return method(*args, **kwargs)
+    finally:
+        client.invalidate_results(*dependencies)
+
+
+class _SessionProxy:
+    """interface proxy, that tells the client when a method changing the session is used
+
+    a goal method marks the session as holding goal state, a method in
+    INVALIDATING_METHODS drops the cached results depending on it when called.
+    """
+
+    __slots__ = ("_proxy", "_client", "_goal_methods", "_invalidates")
+
+    def __init__(
+        self, proxy, client: "Dnf5DbusClient", goal_methods: set[str], invalidates: dict[str, tuple[str]]
+    ) -> None:
+        self._proxy = proxy
+        self._client = client
+        self._goal_methods = goal_methods
+        self._invalidates = invalidates
+
+    def __getattr__(self, name: str):
+        if name in self._goal_methods:
+            self._client._goal_state = name != "reset"
+        method = getattr(self._proxy, name)
+        if name in self._invalidates:
+            return partial(_call_invalidating, self._client, self._invalidates[name], method)
+        return method
+
+
+def _session_interface(interface: str) -> property:
+    """property with the interface proxy of the open session, made on first use"""
+
+    def getter(self):
+        proxy = self.proxies.interface(self.session, interface)
+        if interface in GOAL_METHODS or interface in INVALIDATING_METHODS:
+            return _SessionProxy(
+                proxy, self, GOAL_METHODS.get(interface, set()), INVALIDATING_METHODS.get(interface, {})
+            )
+        return proxy
+
+    return property(getter)
+
+
+async def _wait_readable(loop: asyncio.AbstractEventLoop, fd: int) -> None:
+    """wait until there is data to read from fd"""
+    readable = loop.create_future()
+    loop.add_reader(fd, partial(_set_future_result, readable, None))
+    try:
+        await readable
+    finally:
+        loop.remove_reader(fd)
+
+
 class Dnf5DbusClient:
-    def __init__(self):
-        self.bus = dbus.SystemBus()
-        self.iface_session = dbus.Interface(
-            self.bus.get_object(DNFDAEMON_BUS_NAME, DNFDAEMON_OBJECT_PATH),
-            dbus_interface=IFACE_SESSION_MANAGER,
-        )
-        self.async_dbus = AsyncCaller()
+    # the interface proxies of the open session
+    session_repo = _session_interface(IFACE_REPO)
+    session_rpm = _session_interface(IFACE_RPM)
+    session_goal = _session_interface(IFACE_GOAL)
+    session_base = _session_interface(IFACE_BASE)
+    session_advisory = _session_interface(IFACE_ADVISORY)
+    session_group = _session_interface(IFACE_GROUP)
+    session_offline = _session_interface(IFACE_OFFLINE)
+
+    def __init__(self, use_cache: bool = True, rpmdb_path: Path = RPMDB_PATH):
+        # the sync calls are made by the transport, the async calls use its proxies
+        self.transport = DbusPythonTransport()
+        self.proxies = self.transport.proxies
+        self.bus = self.proxies.bus
+        self.iface_session = self.proxies.interface(DNFDAEMON_OBJECT_PATH, IFACE_SESSION_MANAGER)
         self._connected = False
+        # profile and options of the session, a cheaper session is upgraded when needed
+        self.profile = None
+        self._session_options = {}
+        # packages may have been added to the goal of the session, it is lost if the session is reopened
+        self._goal_state = False
+        # persistent package catalog and in-memory query results, disabled by --no-cache
+        self.catalog_cache = CatalogCache() if use_cache else None
+        self.result_cache = ResultCache() if use_cache else None
+        # bumped when the result cache is invalidated, so results from calls
+        # running while it happened are not stored
+        self._cache_generation = 0
+        # trigram index over the names of a catalog snapshot: (options key, packages, index)
+        self._trigram_index = None
+        # keys of the catalog snapshots, that has been checked against the repo revisions in this session
+        self._checked_snapshots: set[str] = set()
+        # identical queries running at the same time share one round-trip
+        self.single_flight = SingleFlight(pump=partial(GLib.MainContext.default().iteration, True))
+        # installed packages sorted by full_nevra, kept up to date by refresh_installed_delta: (options, packages)
+        self._installed = None
+        # rpm database read by package_list_installed
+        self.rpmdb_path = rpmdb_path
+        # chooses list or list_fd in package_list_auto, the history is saved with the catalog cache
+        self.list_router = (
+            ListRouter.load(self.catalog_cache.cache_dir / LIST_ROUTER_FILE) if self.catalog_cache else ListRouter()
+        )
 
     @dbus_exception
-    def open_session(self, options={}):
+    def open_session(self, options={}, profile: str = "full"):
+        """open a session, profile is one of SESSION_PROFILES
+
+        A session with a cheaper profile than full don't load all repositories,
+        it is upgraded (reopened) when a call needs more, using the same options.
+        """
         if not self._connected:
-            logger.debug(f"DBUS: {self.iface_session.object_path}.open_session({options})")
-            self.session = self.iface_session.open_session(options)
+            self._session_options = dict(options)
+            session_options = dict(options, **SESSION_PROFILES[profile])
+            logger.debug(f"DBUS: {self.iface_session.object_path}.open_session({session_options})")
+            t_start = time.monotonic()
+            self.session = self.iface_session.open_session(session_options)
             if self.session:
-                logger.debug(f"open session: {self.session}")
+                logger.debug(f"open session: {self.session} ({profile} in {time.monotonic() - t_start:.2f}s)")
+                self.profile = profile
                 self._connected = True
-                self.session_repo = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_REPO,
-                )
-                self.session_rpm = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_RPM,
-                )
-                self.session_goal = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_GOAL,
-                )
-                self.session_base = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_BASE,
-                )
-                self.session_advisory = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_ADVISORY,
-                )
-                self.session_group = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_GROUP,
-                )
-                self.session_offline = dbus.Interface(
-                    self.bus.get_object(DNFDAEMON_BUS_NAME, self.session),
-                    dbus_interface=IFACE_OFFLINE,
-                )
+                self._goal_state = False
+                self._checked_snapshots.clear()
             else:
                 raise YumexException("Couldn't open session to Dnf5Dbus")
 
@@ -118,115 +274,170 @@ class Dnf5DbusClient:
             logger.debug(f"DBUS: {self.iface_session.object_path}.close_session()")
             rc = self.iface_session.close_session(self.session)
             logger.debug(f"close session: {self.session} ({rc})")
+            self.proxies.forget(self.session)
             self._connected = False
+            if self.catalog_cache is not None:
+                try:
+                    self.list_router.save(self.catalog_cache.cache_dir / LIST_ROUTER_FILE)
+                except OSError as e:
+                    logger.debug(f"list router: cannot save history ({e})")
 
     def reopen_session(self, options=None):
-        """Close and reopen the session"""
+        """Close and reopen the session, with the same profile"""
+        profile = self.profile or "full"
+        # only a full session has the repo revisions
+        compare = self.result_cache is not None and self._connected and profile == "full"
+        revisions = self.repo_revisions() if compare else None
         self.close_session()
         if options:
-            self.open_session(options)
+            self.open_session(options, profile)
         else:
-            self.open_session()
+            self.open_session(profile=profile)
+        if self.result_cache is not None:
+            if compare and self.repo_revisions() != revisions:
+                self.invalidate_results(INSTALLED, AVAILABLE)
+            else:
+                self.invalidate_results(INSTALLED)
+
+    def _ensure_session(self, profile: str) -> None:
+        """open a session or upgrade the open one, if it cannot serve a call needing profile
+
+        upgrading closes the session, a session that may hold goal state is not upgraded, open
+        it with the profile needed for the transaction (or reset the goal) before adding to the goal.
+        """
+        if self._connected and PROFILE_RANK[self.profile] >= PROFILE_RANK[profile]:
+            return
+        if self._connected:
+            if self._goal_state:
+                raise YumexException(
+                    f"Cannot upgrade the {self.profile} session to {profile}, the goal of the session would be lost"
+                )
+            logger.debug(f"session: upgrading {self.profile} session to {profile}")
+            self.close_session()
+        self.open_session(self._session_options, profile)
+
+    def invalidate_results(self, *dependencies: str) -> None:
+        """drop the cached query results depending on INSTALLED and/or AVAILABLE"""
+        self._cache_generation += 1
+        if self.result_cache is not None:
+            self.result_cache.invalidate(*dependencies)
+        if AVAILABLE in dependencies:
+            # check the catalog snapshots against the repos again
+            self._checked_snapshots.clear()
+
+    @dbus_exception
+    def reset(self):
+        """reset the session base, the installed packages are read again"""
+        self._ensure_session("minimal")
+        logger.debug(f"DBUS: {self.session_base.object_path}.reset()")
+        self.invalidate_results(INSTALLED)
+        return self.session_base.reset()
 
     def _async_method(self, method: str, proxy=None) -> partial:
         """create a patial func to make an async call to a given
         dbus method name
         """
-        return partial(self.async_dbus.call, getattr(proxy, method), timeout=1000 * 60 * 20)
+        return partial(AsyncCaller().call, getattr(proxy, method), timeout=1000 * 60 * 20)
+
+    def _call_shared(self, method: str, options: dict, func, *args, nested: bool = False):
+        """func(*args), shared with a running call of the same method and options
+
+        nested: func is an _async_method call, it runs a nested main loop
+        the result is taken from (and stored in) the result cache, if enabled.
+        The result shared with other callers and the cache is not returned, but a copy.
+        """
+        key = f"{method}:{options_key(options)}"
+        shared = self.single_flight.do_nested if nested else self.single_flight.do
+        if self.result_cache is None:
+            return _copy_result(shared(key, func, *args))
+        result = self.result_cache.get(key)
+        if result is not None:
+            logger.debug(f"result cache: {method} answered from cache")
+            return _copy_result(result)
+        generation = self._cache_generation
+        result = shared(key, func, *args)
+        # (result, error) from an AsyncCaller call
+        failed = isinstance(result, tuple) and len(result) == 2 and result[1]
+        if not failed and generation == self._cache_generation:
+            self.result_cache.put(key, result, result_dependencies(method, options))
+        return _copy_result(result)
 
     def resolve(self, *args):
+        self._ensure_session("full")
         logger.debug(f"DBUS: {self.session_goal.object_path}.resolve()")
         resolve = self._async_method("resolve", proxy=self.session_goal)
-        res, err = resolve(dbus.Array())
+        res, err = resolve(dbus.Dictionary({}))
         return res, err
 
     def do_transaction(self, options={}):
+        self._ensure_session("full")
         logger.debug(f"DBUS: {self.session_goal.object_path}.do_transaction()")
         do_transaction = self._async_method("do_transaction", proxy=self.session_goal)
         options["comment"] = "Yum Extender Transaction"
         res, err = do_transaction(options)
+        self.invalidate_results(INSTALLED)
         return res, err
 
     @dbus_exception
     def confirm_key(self, key_id: str, confirmed: bool):
+        self._ensure_session("full")
         return self.session_repo.confirm_key(key_id, confirmed)
 
-    def repo_list(self):
+    def repo_list(self, repo_attrs=None, enable_disable="all"):
+        self._ensure_session("full")
         logger.debug(f"DBUS: {self.session_repo.object_path}.list()")
+        if repo_attrs is None:
+            repo_attrs = ["name", "enabled", "priority"]
         get_list = self._async_method("list", proxy=self.session_repo)
-        res, err = get_list({"repo_attrs": dbus.Array(["name", "enabled", "priority"]), "enable_disable": "all"})
+        options = {"repo_attrs": dbus.Array(repo_attrs), "enable_disable": enable_disable}
+        res, err = self._call_shared("repo.list", options, get_list, options, nested=True)
         return res, err
 
+    @dbus_exception
+    def repo_revisions(self) -> dict[str, str]:
+        """get the metadata revision of the enabled repositories
+
+        it is a plain sync call, so it can be used from a worker thread
+        """
+        self._ensure_session("full")
+        return self._repo_revisions(self.session)
+
+    def _repo_revisions(self, session: str) -> dict[str, str]:
+        """repo_revisions of session, it is not opened (or upgraded)"""
+        logger.debug(f"DBUS: {session}.list()")
+        options = {"repo_attrs": ["revision", "updated"], "enable_disable": "enabled"}
+        repos = self.transport.call(session, IFACE_REPO, "list", options)
+        return {str(repo["id"]): f"{repo.get('revision', '')}:{repo.get('updated', '')}" for repo in repos}
+
     def _list_fd(self, options):
-        """Generator function that yields packages as they arrive from the server."""
+        """Generator function that yields packages as they arrive from the server.
+
+        raise TimeoutError if the server stops sending, so an incomplete list is never cached.
+        """
+        self._ensure_session(_scope_profile(options))
+        yield from self._session_list_fd(self.session, options)
 
+    def _session_list_fd(self, session: str, options):
+        """_list_fd on session, it is not opened (or upgraded)"""
         # create a pipe and pass the write end to the server
         pipe_r, pipe_w = os.pipe()
-        # transfer id serves as an identifier of the pipe transfer for a signal emitted
-        # after server finish. This example does not use it.
-        transfer_id = self.session_rpm.list_fd(options, pipe_w)  # noqa: F841
-        # logger.debug(f"list_fd: transfer_id : {transfer_id}")
-        # close the write end - otherwise poll cannot detect the end of transmission
-        os.close(pipe_w)
-
-        # decoder that will be used to parse incomming data
-        parser = json.JSONDecoder()
-
-        # prepare for polling
-        poller = select.poll()
-        poller.register(pipe_r, select.POLLIN)
-        # wait for data 10 secs at most
-        timeout = 10000
-        # 64k is a typical size of a pipe
-        buffer_size = 65536
-
-        # remaining string to parse (can contain unfinished json from previous run)
-        to_parse = ""
-        # remaining raw data (i.e. data before UTF decoding)
-        raw_data = b""
-        while True:
-            # wait for data
-            polled_event = poller.poll(timeout)
-            if not polled_event:
-                print("Timeout reached.")
-                break
-
-            # we know there is only one fd registered in poller
-            descriptor, event = polled_event[0]
-            # read a chunk of data
-            buffer = os.read(descriptor, buffer_size)
-            if not buffer:
-                # end of file
-                break
-
-            raw_data += buffer
+        try:
             try:
-                to_parse += raw_data.decode()
-                # decode successful, clear remaining raw data
-                raw_data = b""
-            except UnicodeDecodeError:
-                # Buffer size split data in the middle of multibyte UTF character.
-                # Need to read another chunk of data.
-                continue
-
-            # parse JSON objects from the string
-            while to_parse:
-                try:
-                    # skip all chars till begin of next JSON objects (new lines mostly)
-                    json_obj_start = to_parse.find("{")
-                    if json_obj_start < 0:
-                        break
-                    obj, end = parser.raw_decode(to_parse[json_obj_start:])
-                    yield obj
-                    to_parse = to_parse[(json_obj_start + end) :]
-                except json.decoder.JSONDecodeError:
-                    # this is just example which assumes that every decode error
-                    # means the data are incomplete (buffer size split the json
-                    # object in the middle). So the handler does not do anything
-                    # just break the parsing cycle and continue polling.
-                    break
+                # the transfer id identifies the transfer in the signal emitted when the server is done, it is not used
+                self.transport.list_fd(session, options, pipe_w)
+            finally:
+                # close the write end - otherwise poll cannot detect the end of transmission
+                os.close(pipe_w)
+            for _, objs in read_pipes([pipe_r]):
+                yield from objs
+        finally:
+            # finally close read end of the pipe
+            os.close(pipe_r)
 
     @dbus_exception
+    def _list_all(self, options) -> list:
+        return list(self._list_fd(options))
+
     def package_list_fd(self, *args, **kwargs) -> list[list[str]]:
         """call the org.rpm.dnf.v0.rpm.Repo list method
 
@@ -235,30 +446,392 @@ class Dnf5DbusClient:
 
         """
         # logger.debug(f"\n --> args: {args} kwargs: {kwargs}")
-        options = {}
-        options["patterns"] = dbus.Array(args)
-        options["package_attrs"] = dbus.Array(kwargs.pop("package_attrs", ["nevra"]))
-        options["with_src"] = False
-        # options["with_nevra"] = kwargs.pop("with_nevra", True)
-        options["with_provides"] = kwargs.pop("with_provides", False)
-        options["with_filenames"] = kwargs.pop("with_filenames", False)
-        options["with_binaries"] = kwargs.pop("with_binaries", False)
-        options["icase"] = True
-        options["latest-limit"] = kwargs.pop("latest_limit", 1)
-        # limit packages to one of “all”, “installed”, “available”, “upgrades”, “upgradable”
-        options["scope"] = kwargs.pop("scope", "all")
-        if "repo" in kwargs:
-            options["repo"] = kwargs.pop("repo")
-        if "arch" in kwargs:
-            options["arch"] = kwargs.pop("arch")
-        # get and async partial function
-        # logger.debug(f" --> options: {options} ")
-
+        options = list_options(*args, **kwargs)
         # logger.debug(f"DBUS: {self.session_rpm.object_path}.list_fd()")
-        result = list(self._list_fd(options))
+        result = self._call_shared("rpm.list_fd", options, self._list_all, options)
         logger.debug(f"list_fd({args}) returned : {len(result)} elements")
         return result
 
+    @dbus_exception
+    def _list_reply(self, options) -> list:
+        """Rpm.list with the list_fd options, the packages in one D-Bus reply"""
+        logger.debug(f"DBUS: {self.session_rpm.object_path}.list()")
+        get_list = self._async_method("list", proxy=self.session_rpm)
+        res, err = self._call_shared("rpm.list", options, get_list, to_dbus(options), nested=True)
+        if err:
+            raise err
+        return res
+
+    def package_list_auto(self, *args, **kwargs) -> list:
+        """package_list_fd or package_list, the one expected to be the fastest
+
+        list_router estimates the size of the result and chooses the method,
+        the call is recorded to tune the estimates. Returns the packages, like
+        package_list_fd (plain python types with both methods), and raises
+        YumexException on D-Bus errors.
+
+        *args and **kwargs are the same as for package_list_fd
+        """
+        options = list_options(*args, **kwargs)
+        # open the session first, so loading the sack is not timed
+        self._ensure_session(_scope_profile(options))
+        method, rows, _ = self.list_router.choose(options)
+        hits = self.result_cache.hits if self.result_cache is not None else 0
+        saved = self.single_flight.saved
+        t_start = time.monotonic()
+        if method == LIST_FD:
+            result = self._call_shared("rpm.list_fd", options, self._list_all, options)
+        else:
+            # the same python types as the list_fd packages
+            result = from_dbus(self._list_reply(options))
+        seconds = time.monotonic() - t_start
+        # results from the cache or a running call has not been timed
+        cached = self.result_cache is not None and self.result_cache.hits != hits
+        if not cached and self.single_flight.saved == saved:
+            self.list_router.record(options, method, len(result), seconds, rows)
+        return result
+
+    def package_list_cached(self, *args, on_refresh=None, **kwargs) -> list:
+        """package_list_fd backed by the persistent catalog cache
+
+        If there is a snapshot for the same options, it is returned right away
+        and the repo metadata revisions are checked in a background thread.
+        Only if a revision has changed, the packages are listed again, the
+        snapshot is updated and on_refresh(packages) is called from the main loop.
+
+        *args and **kwargs are the same as for package_list_fd
+        """
+        options = list_options(*args, **kwargs)
+        if self.catalog_cache is None:
+            return list(self._list_fd(options))
+        cached = self.catalog_cache.load(options)
+        if cached is None:
+            revisions = self.repo_revisions()
+            packages = list(self._list_fd(options))
+            self.catalog_cache.store(options, revisions, packages)
+            return packages
+        revisions, packages = cached
+        self._start_refresh_catalog(options, revisions, on_refresh)
+        return packages
+
+    def _start_refresh_catalog(self, options, revisions, on_refresh) -> None:
+        """run _refresh_catalog in a worker thread
+
+        the full session is opened here, the worker only uses it, so it never opens
+        a session at the same time as the main thread. If the session is closed
+        while the worker runs, its calls fail and the snapshot is left as it is.
+        """
+        self._ensure_session("full")
+        thread = threading.Thread(
+            target=self._refresh_catalog, args=(self.session, options, revisions, on_refresh), daemon=True
+        )
+        thread.start()
+
+    def _refresh_catalog(self, session: str, options, revisions, on_refresh) -> None:
+        """update the snapshot for options, if the repo revisions of session has changed"""
+        try:
+            current = self._repo_revisions(session)
+            if current == revisions:
+                logger.debug("catalog cache: repo revisions unchanged")
+                return
+            logger.debug("catalog cache: repo revisions changed, refreshing")
+            packages = list(self._session_list_fd(session, options))
+            self.catalog_cache.store(options, current, packages)
+        except Exception as e:
+            # nothing can catch it in the worker thread
+            logger.warning(f"catalog cache: refresh failed ({e})")
+            return
+        if on_refresh:
+            GLib.idle_add(on_refresh, packages)
+
+    def package_list_local(self, *args, **kwargs) -> list:
+        """package_list_fd for name globs, answered from the catalog cache
+
+        The name globs in *args (like "dnf*", "*foo*" or "foo*bar") are matched
+        case insensitive, with a trigram index, against the catalog snapshot of
+        all packages for the same options. When there is no snapshot, all
+        packages are listed once and stored in the catalog cache. The repo
+        metadata revisions of a snapshot are checked in the background, once
+        per session, and the snapshot is updated if they have changed.
+        Without the catalog cache, the daemon is asked every time.
+
+        *args and **kwargs are the same as for package_list_fd
+        """
+        if self.catalog_cache is None:
+            return self.package_list_fd(*args, **kwargs)
+        options = list_options("*", **kwargs)
+        key = options_key(options)
+        if self._trigram_index is None or self._trigram_index[0] != key or key not in self._checked_snapshots:
+            packages = self._catalog_snapshot(options)
+            # nevra is name-[epoch:]version-release.arch, if name was not requested
+            names = [pkg["name"] if "name" in pkg else pkg["nevra"].rsplit("-", 2)[0] for pkg in packages]
+            self._trigram_index = (key, packages, TrigramIndex(names))
+        _, packages, index = self._trigram_index
+        rows = set()
+        for pattern in args:
+            rows.update(index.glob(pattern))
+        return [packages[row] for row in sorted(rows)]
+
+    def _catalog_snapshot(self, options) -> list:
+        """the packages of the catalog snapshot for options, listed and stored if there is none
+
+        the repo revisions of an existing snapshot are checked in the background
+        once per session, the trigram index is dropped if it is refreshed.
+        """
+        key = options_key(options)
+        cached = self.catalog_cache.load(options)
+        if cached is None:
+            logger.debug("catalog cache: no snapshot, listing all packages")
+            revisions = self.repo_revisions()
+            packages = list(self._list_fd(options))
+            self.catalog_cache.store(options, revisions, packages)
+            self._checked_snapshots.add(key)
+            return packages
+        revisions, packages = cached
+        if key not in self._checked_snapshots:
+            self._checked_snapshots.add(key)
+            self._start_refresh_catalog(options, revisions, self._drop_trigram_index)
+        return packages
+
+    def _drop_trigram_index(self, packages) -> None:
+        """on_refresh for the catalog snapshot behind the trigram index"""
+        self._trigram_index = None
+
+    def package_search_index(self) -> SearchIndex:
+        """inverted index over the name, summary and description of all packages
+
+        The index is saved next to the catalog cache and only built again,
+        from a single list_fd call, when the repo metadata revisions change.
+        """
+        revisions = self.repo_revisions()
+        path = None
+        if self.catalog_cache is not None:
+            path = self.catalog_cache.cache_dir / SEARCH_INDEX_FILE
+            saved = SearchIndex.load(path)
+            if saved is not None and saved[0] == revisions:
+                return saved[1]
+        options = list_options("*", package_attrs=["name", "summary", "description"])
+        index = SearchIndex.build(self._list_fd(options))
+        logger.debug(f"search index: {len(index)} packages indexed")
+        if path is not None:
+            index.save(path, revisions)
+        return index
+
+    def package_name_completer(self, with_provides: bool = False, popularity: dict[str, int] = None) -> NameCompleter:
+        """prefix completion for the names of all packages (and their provides)
+
+        Built from a single list_fd call with only the name columns, after a
+        transaction use NameCompleter.add(), remove() and set_installed() to
+        update it, instead of building it again.
+        """
+        package_attrs = ["name", "is_installed"]
+        if with_provides:
+            package_attrs.append("provides")
+        options = list_options("*", package_attrs=package_attrs)
+        completer = NameCompleter.build(self._list_fd(options), with_provides=with_provides, popularity=popularity)
+        logger.debug(f"name completer: {len(completer)} names")
+        return completer
+
+    def package_list_installed(self, package_attrs: list[str] = None) -> list[dict]:
+        """list the installed packages, read directly from the rpm database
+
+        It is a lot faster than asking the daemon, as it don't have to load the
+        sack first. The daemon is only used, if the database cannot be read or
+        package_attrs contains attributes not in the database reader.
+        """
+        package_attrs = package_attrs or ["nevra"]
+        try:
+            return list(installed_packages(package_attrs, self.rpmdb_path))
+        except (OSError, ValueError, sqlite3.Error) as e:
+            logger.debug(f"rpmdb: cannot read {self.rpmdb_path} ({e}), asking the daemon")
+        return self.package_list_fd("*", package_attrs=package_attrs, scope="installed", latest_limit=0)
+
+    def package_iter_offline(
+        self, package_attrs: list[str] = None, repos: list[str] = None, cache_dirs: list[Path] = None
+    ):
+        """Generator that yields the available packages from the metadata in the dnf/libdnf5 cache
+
+        It don't need the daemon or an open session, so it can be used to show
+        the packages while the session is loading, the first ones are there
+        before all repositories are read. The metadata can be older than the
+        one the daemon loads and all versions are listed.
+
+        cache_dirs are the cache directories to read (default repo_metadata.default_cache_dirs())
+        """
+        return available_packages(package_attrs, repos, cache_dirs)
+
+    def package_list_offline(
+        self, package_attrs: list[str] = None, repos: list[str] = None, cache_dirs: list[Path] = None
+    ) -> list[dict]:
+        """list the packages from package_iter_offline"""
+        return list(self.package_iter_offline(package_attrs, repos, cache_dirs))
+
+    def refresh_installed_delta(self, transaction_items=None, package_attrs: list[str] = None) -> ChangeSet:
+        """return the changes in the installed packages since the last call
+
+        With transaction_items, the resolved items (res[0] from resolve()) of a
+        transaction that has been done, only the added packages are listed, else
+        all installed packages are listed (from the rpm database) and diffed with
+        the last list.
+        The first call lists all installed packages and they are all added.
+
+        The installed list, the cached query result and catalog snapshot for it
+        are patched in place, so the next
+        package_list_fd("*", package_attrs=..., scope="installed", latest_limit=0)
+        with the same package_attrs (full_nevra last, if it was not in them) don't
+        have to ask the daemon. latest_limit=0 keeps all installed versions of a
+        package (like installonly kernels), the default of 1 is another query.
+        """
+        package_attrs = list(package_attrs or ["full_nevra"])
+        if "full_nevra" not in package_attrs:
+            package_attrs.append("full_nevra")
+        options = list_options("*", package_attrs=package_attrs, scope="installed", latest_limit=0)
+        if self._installed is None or self._installed[0] != options:
+            installed = sorted(self.package_list_installed(package_attrs), key=lambda pkg: pkg["full_nevra"])
+            self._installed = (options, installed)
+            change_set = ChangeSet(added=list(installed))
+        else:
+            installed = self._installed[1]
+            change_set = None
+            if transaction_items is not None:
+                change_set = self._transaction_change_set(transaction_items, options, installed)
+            if change_set is None:
+                current = sorted(self.package_list_installed(package_attrs), key=lambda pkg: pkg["full_nevra"])
+                change_set = ChangeSet.from_records(*merge_diff(installed, current))
+            patch_sorted(installed, change_set)
+        logger.debug(f"installed delta: {change_set}")
+        if self.result_cache is not None:
+            self.result_cache.put(f"rpm.list_fd:{options_key(options)}", list(installed), frozenset((INSTALLED,)))
+        if self.catalog_cache is not None and change_set:
+            cached = self.catalog_cache.load(options)
+            if cached is not None:
+                self.catalog_cache.store(options, cached[0], installed)
+            if self._trigram_index is not None and self._trigram_index[0] == options_key(options):
+                self._trigram_index = None
+        return change_set
+
+    def _transaction_change_set(self, transaction_items, options, installed) -> ChangeSet | None:
+        """the change set from resolved transaction items, None if they don't match the installed list"""
+        added_nevras, removed_nevras = transaction_delta(transaction_items)
+        by_nevra = {pkg["full_nevra"]: pkg for pkg in installed}
+        # a reinstalled package replaces itself
+        removed_nevras.extend(nevra for nevra in added_nevras if nevra in by_nevra and nevra not in removed_nevras)
+        if any(nevra not in by_nevra for nevra in removed_nevras):
+            return None
+        added = []
+        if added_nevras:
+            added = self._list_all(dict(options, patterns=list(added_nevras)))
+            if sorted(pkg["full_nevra"] for pkg in added) != sorted(added_nevras):
+                return None
+        return ChangeSet.from_records(added, [by_nevra[nevra] for nevra in removed_nevras])
+
+    @dbus_exception
+    def package_list_multi(self, *args, repos: list[str], merge: bool = True, **kwargs) -> list | dict[str, list]:
+        """list packages from multiple repositories at the same time
+
+        A list_fd transfer is started for every repo in repos, before reading
+        from any of them, and all the pipes are read by a single poller, so the
+        total time is close to the time of the slowest repo.
+
+        *args and **kwargs are the same as for package_list_fd
+
+        return a list with the packages from all repos, or a dict with a list
+        for each repo when merge=False
+        """
+        self._ensure_session("full")
+        results = {repo: [] for repo in repos}
+        # read end of the pipe -> repo
+        pipes = {}
+        try:
+            t_start = time.monotonic()
+            for repo in repos:
+                options = list_options(*args, repo=[repo], **kwargs)
+                pipe_r, pipe_w = os.pipe()
+                # registered before the call, so it is closed if the call fails
+                pipes[pipe_r] = repo
+                try:
+                    logger.debug(f"DBUS: {self.session_rpm.object_path}.list_fd() repo: {repo}")
+                    self.transport.list_fd(self.session, options, pipe_w)
+                finally:
+                    # close the write end - otherwise poll cannot detect the end of transmission
+                    os.close(pipe_w)
+            for pipe_r, objs in read_pipes(list(pipes)):
+                results[pipes[pipe_r]].extend(objs)
+            logger.debug(
+                f"list_fd({repos}) returned : {sum(len(pkgs) for pkgs in results.values())} elements "
+                f"in {time.monotonic() - t_start:.2f}s"
+            )
+        finally:
+            for pipe_r in pipes:
+                os.close(pipe_r)
+        if merge:
+            return [pkg for repo in repos for pkg in results[repo]]
+        return results
+
+    async def alist_fd(self, *args, **kwargs):
+        """Async generator that yields packages as they arrive from the server.
+
+        Takes the same arguments as package_list_fd, but the pipe is watched by
+        the running asyncio loop (the GLibEventLoopPolicy loop when used in the
+        GUI) instead of blocking in poll(). A new chunk is only read when the
+        consumer has taken all packages from the previous one, and leaving the
+        async for loop or cancelling the task closes the pipe, so the server
+        stops the transfer.
+
+            async for pkg in client.alist_fd("*", scope="upgrades"):
+                ...
+        """
+        loop = asyncio.get_running_loop()
+        options = list_options(*args, **kwargs)
+        self._ensure_session(_scope_profile(options))
+        pipe_r, pipe_w = os.pipe()
+        os.set_blocking(pipe_r, False)
+        try:
+            # the write end is passed in the message, so it can be closed as soon
+            # as the call is sent, we don't have to wait for the reply.
+            reply = loop.create_future()
+            logger.debug(f"DBUS: {self.session_rpm.object_path}.list_fd()")
+            self.session_rpm.list_fd(
+                to_dbus(options),
+                pipe_w,
+                reply_handler=partial(_set_future_result, reply),
+                error_handler=partial(_set_future_exception, reply),
+            )
+        finally:
+            # close the write end - otherwise we cannot detect the end of transmission
+            os.close(pipe_w)
+        decoder = JsonStreamDecoder()
+        buffer = bytearray(READ_SIZE)
+        try:
+            # the transfer id is not used, but raise the D-Bus error if the call failed
+            await reply
+            while True:
+                await _wait_readable(loop, pipe_r)
+                try:
+                    objs = read_chunk(pipe_r, buffer, decoder)
+                except BlockingIOError:
+                    continue
+                if objs is None:
+                    # end of file
+                    break
+                for obj in objs:
+                    yield obj
+            for obj in decoder.close():
+                yield obj
+        finally:
+            # close read end of the pipe, also when the consumer stopped early or
+            # the task was cancelled.
+            os.close(pipe_r)
+
+    async def asearch(self, query: str, **kwargs) -> list[dict]:
+        """return the packages with query in the name (case insensitive)
+
+        Used by the SearchScheduler, **kwargs are the same as for alist_fd,
+        package_attrs must contain name to refine the result with refine_by_name.
+        """
+        kwargs.setdefault("package_attrs", ["name", "nevra", "summary", "repo_id"])
+        return [pkg async for pkg in self.alist_fd(f"*{query}*", **kwargs)]
+
     @dbus_exception
     def _test_exception(self):
         """Just for testing purpose"""
@@ -271,28 +844,13 @@ class Dnf5DbusClient:
         **kwargs can contain other options like package_attrs, repo or scope
 
         """
-        # logger.debug(f"\n --> args: {args} kwargs: {kwargs}")
-        options = {}
-        options["patterns"] = dbus.Array(args)
-        options["package_attrs"] = dbus.Array(kwargs.pop("package_attrs", ["nevra"]))
-        options["with_src"] = False
-        # options["with_nevra"] = kwargs.pop("with_nevra", True)
-        # options["with_provides"] = kwargs.pop("with_provides", False)
-        # options["with_filenames"] = kwargs.pop("with_filenames", False)
-        # options["with_binaries"] = kwargs.pop("with_binaries", False)
-        options["icase"] = True
-        options["latest-limit"] = kwargs.pop("latest_limit", 1)
-        # limit packages to one of “all”, “installed”, “available”, “upgrades”, “upgradable”
-        options["scope"] = kwargs.pop("scope", "all")
-        if "repo" in kwargs:
-            options["repo"] = kwargs.pop("repo")
-        if "arch" in kwargs:
-            options["arch"] = kwargs.pop("arch")
+        options = list_options(*args, **kwargs)
+        self._ensure_session(_scope_profile(options))
         # get and async partial function
         # logger.debug(f" --> options: {options} ")
         logger.debug(f"DBUS: {self.session_rpm.object_path}.list()")
         get_list = self._async_method("list", proxy=self.session_rpm)
-        res, err = get_list(options)
+        res, err = self._call_shared("rpm.list", options, get_list, to_dbus(options), nested=True)
         # print(res, err)
         # return as native types.
         if err:
@@ -308,19 +866,23 @@ class Dnf5DbusClient:
         # options[""] = get_variant(list[str], [])
         # print(f" --> options: {options} ")
         # print(self.session_advisory)
+        self._ensure_session("full")
         logger.debug(f"DBUS: {self.session_advisory.object_path}.list()")
         get_list = self._async_method("list", proxy=self.session_advisory)
-        res, err = get_list(options)
+        res, err = self._call_shared("advisory.list", options, get_list, options, nested=True)
         return res, err
 
     @dbus_exception
     def clean(self, metadata_type):
+        self._ensure_session("minimal")
         result = self.session_base.clean(metadata_type)
         logger.debug(f"clean : {result}")
+        self.invalidate_results(INSTALLED, AVAILABLE)
         return result
 
     @dbus_exception
     def system_upgrade(self, options):
+        self._ensure_session("full")
         logger.debug(f"DBUS: system-upgrade({options})")
         system_upgrade = self._async_method("system_upgrade", proxy=self.session_rpm)
         res, err = system_upgrade(options)
@@ -330,6 +892,7 @@ class Dnf5DbusClient:
     @dbus_exception
     def offline_get_status(self):
         """Get the status of the offline update"""
+        self._ensure_session("minimal")
         logger.debug(f"DBUS: {self.session_offline.object_path}.get_status()")
         pending, status = self.session_offline.get_status()
         logger.debug(f"offline_get_status() returned : pending : {pending} stautus :{status}")
@@ -338,6 +901,7 @@ class Dnf5DbusClient:
     @dbus_exception
     def offline_clean(self):
         """Cancel the offline update"""
+        self._ensure_session("minimal")
         logger.debug(f"DBUS: {self.session_offline.object_path}.cancel()")
         clean = self._async_method("clean", proxy=self.session_offline)
         success, err_msg = clean()
@@ -347,6 +911,7 @@ class Dnf5DbusClient:
     @dbus_exception
     def offline_reboot(self):
         """Reboot the system and install the offline update"""
+        self._ensure_session("minimal")
         logger.debug(f"DBUS: {self.session_offline.object_path}.set_finish_action()")
         reboot = self._async_method("set_finish_action", proxy=self.session_offline)
         success, err_msg = reboot("reboot")
@@ -0,0 +1,113 @@
+from bisect import bisect_left
+
+from nevra import split_nevra
+
+# transaction item actions (from Goal.resolve) adding or removing an installed package
+INSTALL_ACTIONS = {"Install", "Upgrade", "Downgrade", "Reinstall"}
+REMOVE_ACTIONS = {"Remove", "Replaced"}
+
+
+def _name_arch(full_nevra: str) -> tuple[str, str]:
+    nevra = split_nevra(full_nevra)
+    return nevra.name, nevra.arch
+
+
+class ChangeSet:
+    """The changes in the installed packages made by a transaction
+
+    added and removed are list_fd records, changed is (old, new) pairs of
+    records with the same name.arch (upgrades, downgrades and reinstalls).
+    """
+
+    def __init__(self, added: list[dict] = None, removed: list[dict] = None, changed: list[tuple[dict, dict]] = None):
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self) -> str:
+        return f"ChangeSet(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+    @classmethod
+    def from_records(cls, added: list[dict], removed: list[dict]) -> "ChangeSet":
+        """make the change set, an added and a removed package with the same name.arch is a change"""
+        removed_by_na = {}
+        for pkg in removed:
+            removed_by_na.setdefault(_name_arch(pkg["full_nevra"]), []).append(pkg)
+        change_set = cls()
+        for pkg in added:
+            old = removed_by_na.get(_name_arch(pkg["full_nevra"]))
+            if old:
+                change_set.changed.append((old.pop(), pkg))
+            else:
+                change_set.added.append(pkg)
+        change_set.removed = [pkg for pkgs in removed_by_na.values() for pkg in pkgs]
+        return change_set
+
+    def update_completer(self, completer, installed: list[dict]) -> None:
+        """update the installed state in a NameCompleter
+
+        installed is the installed records after the changes (like the list
+        patched by refresh_installed_delta), a removed name stays installed when
+        another version or arch of it is still installed (like kernels)
+        """
+        if self.removed:
+            installed_names = {_name_arch(pkg["full_nevra"])[0] for pkg in installed}
+            for pkg in self.removed:
+                name = _name_arch(pkg["full_nevra"])[0]
+                if name not in installed_names:
+                    completer.set_installed(name, False)
+        for pkg in self.added:
+            completer.add(_name_arch(pkg["full_nevra"])[0], installed=True)
+
+
+def transaction_delta(items) -> tuple[list[str], list[str]]:
+    """the full_nevra of the installed and removed packages in resolved transaction items"""
+    installed, removed = [], []
+    for object_type, action, _reason, _item_attrs, pkg in items:
+        if object_type != "Package":
+            continue
+        if action in INSTALL_ACTIONS:
+            installed.append(str(pkg["full_nevra"]))
+        elif action in REMOVE_ACTIONS:
+            removed.append(str(pkg["full_nevra"]))
+    return installed, removed
+
+
+def merge_diff(old: list[dict], new: list[dict], key: str = "full_nevra") -> tuple[list[dict], list[dict]]:
+    """(added, removed) records between two lists sorted by key"""
+    added, removed = [], []
+    ndx_old = ndx_new = 0
+    while ndx_old < len(old) and ndx_new < len(new):
+        old_key = old[ndx_old][key]
+        new_key = new[ndx_new][key]
+        if old_key == new_key:
+            ndx_old += 1
+            ndx_new += 1
+        elif old_key < new_key:
+            removed.append(old[ndx_old])
+            ndx_old += 1
+        else:
+            added.append(new[ndx_new])
+            ndx_new += 1
+    removed.extend(old[ndx_old:])
+    added.extend(new[ndx_new:])
+    return added, removed
+
+
+def patch_sorted(packages: list[dict], change_set: ChangeSet, key: str = "full_nevra") -> None:
+    """apply the change set to a list of records sorted by key, in place"""
+    keys = [pkg[key] for pkg in packages]
+    removed = change_set.removed + [old for old, _ in change_set.changed]
+    for pkg in removed:
+        ndx = bisect_left(keys, pkg[key])
+        if ndx < len(keys) and keys[ndx] == pkg[key]:
+            del keys[ndx]
+            del packages[ndx]
+    added = change_set.added + [new for _, new in change_set.changed]
+    for pkg in added:
+        ndx = bisect_left(keys, pkg[key])
+        keys.insert(ndx, pkg[key])
+        packages.insert(ndx, pkg)
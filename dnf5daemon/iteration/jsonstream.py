@@ -0,0 +1,116 @@
+import codecs
+import json
+import os
+import select
+
+# 64k is a typical size of a pipe, the buffer is reused for every read
+READ_SIZE = 65536
+# wait for data 10 secs at most
+POLL_TIMEOUT = 10000
+
+
+class JsonStreamDecoder:
+    """Incremental decoder for the stream of JSON objects written by Rpm.list_fd()
+
+    Raw bytes are collected in a bytearray and only the part up to the last
+    record boundary (newline) is UTF-8 decoded and parsed, so every byte is
+    copied and parsed once and the total cost grows linearly with the payload.
+    Unfinished data stays in the bytearray until the next chunk arrives.
+    """
+
+    def __init__(self) -> None:
+        self._parser = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        # raw data not decoded yet (the unfinished record from the last chunk)
+        self._pending = bytearray()
+        # decoded text that didn't contain a complete JSON object
+        self._tail = ""
+
+    def feed(self, data) -> list[dict]:
+        """Add a chunk of raw data and return the JSON objects completed by it"""
+        pending = self._pending
+        pending += data
+        end = pending.rfind(b"\n") + 1
+        if not end:
+            return []
+        with memoryview(pending) as view, view[:end] as complete:
+            text = self._utf8.decode(complete)
+        # deleting from the front of a bytearray only moves its start offset
+        del pending[:end]
+        return self._parse(text)
+
+    def close(self) -> list[dict]:
+        """Parse what is left at the end of the stream
+
+        raise ValueError if the stream ends with incomplete data.
+        """
+        try:
+            text = self._utf8.decode(bytes(self._pending), final=True)
+        except UnicodeDecodeError as e:
+            raise ValueError("Failed to decode part of received data.") from e
+        self._pending.clear()
+        objs = self._parse(text)
+        if self._tail.strip():
+            raise ValueError("Failed to parse part of received data.")
+        return objs
+
+    def _parse(self, text: str) -> list[dict]:
+        """parse all complete JSON objects from text"""
+        if self._tail:
+            text = self._tail + text
+            self._tail = ""
+        raw_decode = self._parser.raw_decode
+        objs = []
+        pos = 0
+        length = len(text)
+        while pos < length:
+            # skip all chars till begin of next JSON objects (new lines mostly)
+            start = text.find("{", pos)
+            if start < 0:
+                break
+            try:
+                obj, pos = raw_decode(text, start)
+            except json.decoder.JSONDecodeError:
+                # the object continues in the next chunk (the server didn't end
+                # the record with a newline), keep it for the next round.
+                self._tail = text[start:]
+                break
+            objs.append(obj)
+        return objs
+
+
+def read_chunk(fd: int, buffer: bytearray, decoder: JsonStreamDecoder) -> list[dict] | None:
+    """read a chunk from fd into buffer, return the objects completed by it (None at end of file)"""
+    length = os.readv(fd, [buffer])
+    if not length:
+        return None
+    with memoryview(buffer) as view, view[:length] as chunk:
+        return decoder.feed(chunk)
+
+
+def read_pipes(fds: list[int], timeout: int = POLL_TIMEOUT):
+    """read the Rpm.list_fd streams from the read ends of the pipes in fds, with one poller
+
+    yields (fd, objects) as the objects arrive, and the rest at the end of the
+    stream of fd. The fds are not closed.
+    raise TimeoutError if no pipe has data for timeout ms, what was read is
+    incomplete and must not be cached.
+    """
+    decoders = {fd: JsonStreamDecoder() for fd in fds}
+    poller = select.poll()
+    for fd in decoders:
+        poller.register(fd, select.POLLIN)
+    buffer = bytearray(READ_SIZE)
+    running = len(decoders)
+    while running:
+        polled_events = poller.poll(timeout)
+        if not polled_events:
+            raise TimeoutError(f"list_fd: no data in {timeout}ms, the transfer is incomplete")
+        for fd, event in polled_events:
+            objs = read_chunk(fd, buffer, decoders[fd])
+            if objs is None:
+                # end of file for this pipe
+                poller.unregister(fd)
+                running -= 1
+                objs = decoders[fd].close()
+            yield fd, objs
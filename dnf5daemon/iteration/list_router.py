@@ -0,0 +1,238 @@
+"""
+Choose between Rpm.list and Rpm.list_fd for a package query
+
+Rpm.list sends the packages in one D-Bus reply, it is the fastest for small
+results, but a large reply (like all packages) takes long to marshal and can
+hit the message size limit of the bus. Rpm.list_fd needs a pipe, polling and
+JSON decoding, but streams large results a lot faster.
+
+ListRouter estimates the size of the result from the options (patterns,
+scope and package_attrs) and the number of rows returned by earlier queries
+of the same shape. Each method has a cost model (fixed time + time per byte),
+fitted to the timings of the earlier calls, and the cheapest one is used.
+Every call is recorded (method, estimate, rows, seconds) for tuning.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+LIST = "list"
+LIST_FD = "list_fd"
+
+# approx. bytes of a package attribute in a reply, the lists (files, changelogs...) are for a typical package
+ATTR_BYTES = {
+    "name": 20,
+    "epoch": 2,
+    "version": 10,
+    "release": 20,
+    "arch": 7,
+    "evr": 30,
+    "nevra": 45,
+    "full_nevra": 47,
+    "repo_id": 12,
+    "from_repo_id": 12,
+    "is_installed": 1,
+    "install_size": 8,
+    "download_size": 8,
+    "buildtime": 8,
+    "sourcerpm": 50,
+    "summary": 60,
+    "url": 40,
+    "license": 25,
+    "description": 400,
+    "reason": 10,
+    "vendor": 20,
+    "group": 20,
+    "files": 4000,
+    "changelogs": 6000,
+    "provides": 300,
+    "requires": 500,
+}
+DEFAULT_ATTR_BYTES = 200
+# the package id and the dict of each row
+ROW_BYTES = 40
+
+# rows matched by "*" in a scope, used until there are results of the same shape
+SCOPE_ROWS = {"all": 75000, "available": 72000, "installed": 2500, "upgrades": 150, "upgradable": 150}
+# rows for a pattern without wildcards (a name, in a few versions or archs)
+NAME_ROWS = 2
+# each literal char in a glob matches this fraction of the packages
+GLOB_CHAR_FRACTION = 0.25
+
+# replies larger than this always use list_fd, the system bus limit is often 32MB
+MAX_REPLY_BYTES = 16 * 1024 * 1024
+
+# default cost model (fixed seconds, seconds per byte), before there are timings
+DEFAULT_COSTS = {LIST: (0.003, 60e-9), LIST_FD: (0.010, 15e-9)}
+# weight of the default model and how fast old timings are forgotten
+PRIOR_WEIGHT = 0.5
+DECAY = 0.95
+# bytes of the second point in the default model
+PRIOR_BYTES = 1024 * 1024
+
+# shapes with learned row counts and calls kept for tuning
+HISTORY_SIZE = 256
+RECORD_SIZE = 1000
+
+
+def row_bytes(package_attrs: list[str]) -> int:
+    """approx. bytes of a row with package_attrs"""
+    return ROW_BYTES + sum(ATTR_BYTES.get(attr, DEFAULT_ATTR_BYTES) for attr in package_attrs)
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+def query_shape(options: dict) -> str:
+    """the queries with the same shape is expected to return about as many rows
+
+    patterns without wildcards (names) are all alike, globs are kept as they are.
+    """
+    patterns = sorted(
+        str(pattern).lower() if _is_glob(pattern) else "<name>" for pattern in options.get("patterns", [])
+    )
+    repos = sorted(str(repo) for repo in options.get("repo", []))
+    return json.dumps([options.get("scope", "all"), patterns, repos, int(options.get("latest-limit", 1))])
+
+
+def pattern_rows(pattern: str, scope_rows: int) -> float:
+    """the rows a pattern is expected to match, in a scope with scope_rows packages"""
+    if not _is_glob(pattern):
+        return NAME_ROWS
+    literal = sum(char not in "*?[]" for char in pattern)
+    return max(1.0, scope_rows * GLOB_CHAR_FRACTION**literal)
+
+
+class CostModel:
+    """seconds = fixed + per_byte * bytes, fitted with decayed least squares
+
+    The default model is two points weighted PRIOR_WEIGHT, they are never
+    decayed, so the fit is defined before there are enough timings.
+    """
+
+    def __init__(self, fixed: float, per_byte: float) -> None:
+        self.default = (fixed, per_byte)
+        # weighted sums of the timings: w, w*x, w*y, w*x*x, w*x*y
+        self.sums = [0.0] * 5
+
+    def add(self, size: int, seconds: float) -> None:
+        self.sums = [value * DECAY for value in self.sums]
+        for ndx, value in enumerate((1.0, size, seconds, size * size, size * seconds)):
+            self.sums[ndx] += value
+
+    def fit(self) -> tuple[float, float]:
+        fixed, per_byte = self.default
+        points = ((0, fixed), (PRIOR_BYTES, fixed + per_byte * PRIOR_BYTES))
+        w, sx, sy, sxx, sxy = self.sums
+        for x, y in points:
+            w += PRIOR_WEIGHT
+            sx += PRIOR_WEIGHT * x
+            sy += PRIOR_WEIGHT * y
+            sxx += PRIOR_WEIGHT * x * x
+            sxy += PRIOR_WEIGHT * x * y
+        slope = max(0.0, (w * sxy - sx * sy) / (w * sxx - sx * sx))
+        return max(0.0, (sy - slope * sx) / w), slope
+
+    def predict(self, size: int) -> float:
+        fixed, per_byte = self.fit()
+        return fixed + per_byte * size
+
+
+class ListRouter:
+    """route package queries to Rpm.list or Rpm.list_fd, by the expected cost
+
+    method, rows, size = router.choose(options)
+    ... call method ...
+    router.record(options, method, len(result), seconds)
+    """
+
+    def __init__(self, max_reply_bytes: int = MAX_REPLY_BYTES) -> None:
+        self.max_reply_bytes = max_reply_bytes
+        self.costs = {method: CostModel(*cost) for method, cost in DEFAULT_COSTS.items()}
+        # query shape -> learned number of rows (LRU)
+        self.rows: OrderedDict[str, float] = OrderedDict()
+        # the calls made: dicts with the method chosen, the estimate and the timing
+        self.records: deque[dict] = deque(maxlen=RECORD_SIZE)
+
+    def estimate(self, options: dict) -> tuple[int, int]:
+        """the expected (rows, bytes) of the result for the list options"""
+        shape = query_shape(options)
+        if shape in self.rows:
+            rows = self.rows[shape]
+        else:
+            scope_rows = SCOPE_ROWS.get(options.get("scope", "all"), SCOPE_ROWS["all"])
+            if not options.get("latest-limit", 1):
+                # all versions of the available packages
+                scope_rows *= 2
+            # no patterns lists all packages
+            patterns = options.get("patterns") or ["*"]
+            rows = min(scope_rows, sum(pattern_rows(pattern, scope_rows) for pattern in patterns))
+        rows = round(rows)
+        return rows, rows * row_bytes(options.get("package_attrs", ["nevra"]))
+
+    def choose(self, options: dict) -> tuple[str, int, int]:
+        """return the method to use (LIST or LIST_FD), the expected rows and bytes"""
+        rows, size = self.estimate(options)
+        if size > self.max_reply_bytes:
+            method = LIST_FD
+        else:
+            method = min(self.costs, key=lambda name: self.costs[name].predict(size))
+        logger.debug(f"list router: {method} for ~{rows} rows (~{size} bytes)")
+        return method, rows, size
+
+    def record(self, options: dict, method: str, rows: int, seconds: float, estimated_rows: int = None) -> None:
+        """add the result of a call, to learn the rows of the shape and the cost of the method"""
+        shape = query_shape(options)
+        learned = self.rows.pop(shape, None)
+        # moving average, the number of packages changes a little with updates
+        self.rows[shape] = rows if learned is None else 0.5 * learned + 0.5 * rows
+        while len(self.rows) > HISTORY_SIZE:
+            self.rows.popitem(last=False)
+        size = rows * row_bytes(options.get("package_attrs", ["nevra"]))
+        self.costs[method].add(size, seconds)
+        self.records.append(
+            {
+                "time": time.time(),
+                "shape": shape,
+                "method": method,
+                "estimated_rows": estimated_rows,
+                "rows": rows,
+                "bytes": size,
+                "seconds": seconds,
+            }
+        )
+        logger.debug(f"list router: {method} returned {rows} rows (estimated {estimated_rows}) in {seconds:.3f}s")
+
+    def to_dict(self) -> dict:
+        return {
+            "rows": dict(self.rows),
+            "costs": {method: model.sums for method, model in self.costs.items()},
+            "records": list(self.records),
+        }
+
+    def save(self, path: Path) -> None:
+        """save the learned rows, timings and records (as JSON)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: Path) -> "ListRouter":
+        """a router with the history saved in path, a new one if it cannot be read"""
+        router = cls()
+        try:
+            data = json.loads(Path(path).read_text())
+            router.rows.update(data["rows"])
+            for method, sums in data["costs"].items():
+                if method in router.costs and len(sums) == 5:
+                    router.costs[method].sums = [float(value) for value in sums]
+            router.records.extend(data["records"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.debug(f"list router: no history in {path} ({e})")
+        return router
@@ -0,0 +1,68 @@
+from functools import partial
+
+import dbus
+
+
+class KnownInterface(dbus.Interface):
+    """Interface proxy, that passes the known signature of the method arguments
+
+    Without introspection dbus-python must guess the argument types from the
+    python values, that fails for a{sv} options (and empty dicts and lists).
+    """
+
+    def __init__(self, obj, dbus_interface: str, signatures: dict[str, str]) -> None:
+        super().__init__(obj, dbus_interface=dbus_interface)
+        self._signatures = signatures
+
+    def get_dbus_method(self, member, dbus_interface=None):
+        method = super().get_dbus_method(member, dbus_interface)
+        signature = self._signatures.get(member)
+        if signature is None:
+            return method
+        return partial(method, signature=signature)
+
+    def __getattr__(self, member):
+        if member.startswith("__") and member.endswith("__"):
+            raise AttributeError(member)
+        return self.get_dbus_method(member)
+
+
+class ProxyRegistry:
+    """Lazy D-Bus interface proxies for the objects of a service
+
+    A single remote object is made for each object path, without introspection
+    (the interface names are known), and an interface proxy is only made, when
+    it is used the first time. Making them needs no D-Bus round-trip.
+
+    signatures is interface -> method -> signature of the method arguments,
+    for the methods called with types dbus-python cannot guess.
+    """
+
+    def __init__(self, bus: dbus.Bus, bus_name: str, signatures: dict[str, dict[str, str]] = None) -> None:
+        self.bus = bus
+        self.bus_name = bus_name
+        self.signatures = signatures or {}
+        # object path -> remote object
+        self._objects: dict[str, dbus.proxies.ProxyObject] = {}
+        # (object path, interface) -> interface proxy
+        self._interfaces: dict[tuple[str, str], dbus.Interface] = {}
+
+    def remote_object(self, path: str) -> dbus.proxies.ProxyObject:
+        obj = self._objects.get(path)
+        if obj is None:
+            obj = self._objects[path] = self.bus.get_object(self.bus_name, path, introspect=False)
+        return obj
+
+    def interface(self, path: str, interface: str) -> dbus.Interface:
+        proxy = self._interfaces.get((path, interface))
+        if proxy is None:
+            proxy = self._interfaces[(path, interface)] = KnownInterface(
+                self.remote_object(path), interface, self.signatures.get(interface, {})
+            )
+        return proxy
+
+    def forget(self, path: str) -> None:
+        """drop the proxies for path, like when the session is closed"""
+        self._objects.pop(path, None)
+        for key in [key for key in self._interfaces if key[0] == path]:
+            del self._interfaces[key]
@@ -0,0 +1,252 @@
+"""
+Offline reader for the repository metadata in the dnf/libdnf5 cache
+
+Streams the already downloaded primary.xml(.gz/.zst/.xz/.bz2) files, so the
+available packages can be shown before the daemon (or dnf.Base) has loaded the
+repositories. The files are decompressed in chunks and parsed with a pull
+parser, every package element is cleared when it has been read, so the whole
+document is never in memory. The records has the same shape as the records
+from Dnf5DbusClient.package_list_fd(), but all versions in the repositories
+are listed (no latest-limit) and the metadata may be older than the one the
+daemon will load.
+
+Reading zstd compressed metadata (primary.xml.zst, the default on Fedora) needs
+the optional python3-zstandard module (not a dependency of the other scripts).
+Without it, and for unreadable, truncated or malformed files, the rest of the
+repo is skipped with a warning, the daemon has to list its packages.
+
+run: python3 repo_metadata.py [cache dir ...]
+"""
+
+import bz2
+import logging
+import lzma
+import os
+import zlib
+from pathlib import Path
+from xml.etree.ElementTree import XMLPullParser, parse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# read and decompress this much at the time
+CHUNK_SIZE = 64 * 1024
+
+# errors from a primary file, that can't be read, has corrupt or truncated compressed data or malformed XML
+# (xml.etree.ElementTree.ParseError is a SyntaxError)
+READ_ERRORS = (OSError, EOFError, ValueError, SyntaxError, zlib.error, lzma.LZMAError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+REPO_NS = "{http://linux.duke.edu/metadata/repo}"
+COMMON_NS = "{http://linux.duke.edu/metadata/common}"
+RPM_NS = "{http://linux.duke.edu/metadata/rpm}"
+
+# the list_fd package attributes found in primary.xml
+SUPPORTED_ATTRS = {
+    "name",
+    "epoch",
+    "version",
+    "release",
+    "arch",
+    "evr",
+    "nevra",
+    "full_nevra",
+    "summary",
+    "description",
+    "url",
+    "download_size",
+    "install_size",
+    "license",
+    "sourcerpm",
+    "vendor",
+    "group",
+    "repo_id",
+    "is_installed",
+}
+
+
+def default_cache_dirs() -> list[Path]:
+    """the libdnf5 and dnf cache directories, the system and user ones
+
+    with dnf4, use the directories from DnfBase.cachedir_fit() instead.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return [
+        Path("/var/cache/libdnf5"),
+        Path(cache_home) / "libdnf5",
+        Path("/var/cache/dnf"),
+    ]
+
+
+def primary_files(cache_dirs: list[Path] = None) -> dict[str, Path]:
+    """repo id -> the primary.xml file in the newest cache of the repo
+
+    the repo caches are named <repo id>-<hash> and has the downloaded metadata
+    in repodata/, repomd.xml tells the name of the primary file.
+    """
+    found: dict[str, tuple[float, Path]] = {}
+    for cache_dir in cache_dirs or default_cache_dirs():
+        for repomd in Path(cache_dir).glob("*/repodata/repomd.xml"):
+            repo_dir = repomd.parent.parent
+            repo_id = repo_dir.name.rsplit("-", 1)[0]
+            try:
+                mtime = repomd.stat().st_mtime
+                if repo_id in found and found[repo_id][0] >= mtime:
+                    continue
+                for data in parse(repomd).getroot().iter(f"{REPO_NS}data"):
+                    if data.get("type") == "primary":
+                        location = data.find(f"{REPO_NS}location").get("href")
+                        primary = repo_dir / location
+                        if primary.exists():
+                            found[repo_id] = (mtime, primary)
+                        break
+            except (OSError, SyntaxError, AttributeError) as e:
+                logger.debug(f"repo metadata: ignoring {repomd} ({e})")
+    return {repo_id: primary for repo_id, (_, primary) in found.items()}
+
+
+def _decompressor(path: Path):
+    """decompressor object for the file, with a decompress(data) method"""
+    suffix = path.suffix
+    if suffix == ".gz":
+        # 16 + MAX_WBITS: gzip header
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if suffix == ".xz":
+        return lzma.LZMADecompressor()
+    if suffix == ".bz2":
+        return bz2.BZ2Decompressor()
+    if suffix == ".zst":
+        if zstandard is None:
+            raise ValueError(f"python3-zstandard is needed to read {path}")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def _record(elem, repo_id: str, package_attrs: list[str]) -> dict:
+    """make a list_fd shaped record from a <package> element"""
+    name = elem.findtext(f"{COMMON_NS}name", "")
+    arch = elem.findtext(f"{COMMON_NS}arch", "")
+    version_elem = elem.find(f"{COMMON_NS}version")
+    epoch = version_elem.get("epoch", "0") or "0"
+    version = version_elem.get("ver", "")
+    release = version_elem.get("rel", "")
+    evr = f"{version}-{release}" if epoch == "0" else f"{epoch}:{version}-{release}"
+    record = {}
+    for attr in package_attrs:
+        if attr == "name":
+            record[attr] = name
+        elif attr == "epoch":
+            record[attr] = epoch
+        elif attr == "version":
+            record[attr] = version
+        elif attr == "release":
+            record[attr] = release
+        elif attr == "arch":
+            record[attr] = arch
+        elif attr == "evr":
+            record[attr] = evr
+        elif attr == "nevra":
+            record[attr] = f"{name}-{evr}.{arch}"
+        elif attr == "full_nevra":
+            record[attr] = f"{name}-{epoch}:{version}-{release}.{arch}"
+        elif attr in ("summary", "description", "url"):
+            record[attr] = elem.findtext(f"{COMMON_NS}{attr}", "")
+        elif attr in ("download_size", "install_size"):
+            size = elem.find(f"{COMMON_NS}size")
+            key = "package" if attr == "download_size" else "installed"
+            record[attr] = int(size.get(key, 0)) if size is not None else 0
+        elif attr in ("license", "sourcerpm", "vendor", "group"):
+            record[attr] = elem.findtext(f"{COMMON_NS}format/{RPM_NS}{attr}", "")
+        elif attr == "repo_id":
+            record[attr] = repo_id
+        elif attr == "is_installed":
+            record[attr] = False
+    return record
+
+
+def _check_attrs(package_attrs: list[str] = None) -> list[str]:
+    """the package_attrs (default nevra), raises ValueError for attrs not in the metadata"""
+    package_attrs = package_attrs or ["nevra"]
+    unsupported = [attr for attr in package_attrs if attr not in SUPPORTED_ATTRS]
+    if unsupported:
+        raise ValueError(f"package attributes not supported by the metadata reader: {unsupported}")
+    return package_attrs
+
+
+def read_primary(path: Path, repo_id: str, package_attrs: list[str] = None, with_src: bool = False):
+    """Generator that yields the packages in a primary.xml file
+
+    raises ValueError for package_attrs not in the metadata
+    """
+    package_attrs = _check_attrs(package_attrs)
+    path = Path(path)
+    decompressor = _decompressor(path)
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if decompressor is not None and data:
+                data = decompressor.decompress(data)
+            if data:
+                parser.feed(data)
+            else:
+                parser.close()
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    continue
+                if elem.tag != f"{COMMON_NS}package":
+                    continue
+                if with_src or elem.findtext(f"{COMMON_NS}arch") != "src":
+                    yield _record(elem, repo_id, package_attrs)
+                # the package is read, free it and remove it from the root
+                elem.clear()
+                root.clear()
+            if not data:
+                break
+
+
+def available_packages(package_attrs: list[str] = None, repos: list[str] = None, cache_dirs: list[Path] = None):
+    """Generator that yields the packages of the cached repositories
+
+    repos limits the repositories to read (default all in the cache). A repo
+    that can't be read is skipped with a warning, the packages read before the
+    error are kept (the packages of the other repos are still listed).
+    raises ValueError for package_attrs not in the metadata
+    """
+    package_attrs = _check_attrs(package_attrs)
+    for repo_id, primary in sorted(primary_files(cache_dirs).items()):
+        if repos is not None and repo_id not in repos:
+            continue
+        logger.debug(f"repo metadata: reading {primary}")
+        count = 0
+        try:
+            for pkg in read_primary(primary, repo_id, package_attrs):
+                count += 1
+                yield pkg
+        except READ_ERRORS as e:
+            logger.warning(f"repo metadata: skipping {repo_id} after {count} packages, cannot read {primary} ({e})")
+
+
+if __name__ == "__main__":
+    import sys
+    from timeit import default_timer as timer
+
+    cache_dirs = [Path(arg) for arg in sys.argv[1:]] or None
+    print(f"primary files : {primary_files(cache_dirs)}")
+    t1 = timer()
+    first = None
+    count = 0
+    for pkg in available_packages(["nevra", "repo_id", "summary"], cache_dirs=cache_dirs):
+        if first is None:
+            first = timer()
+            print(f"first package after {(first - t1) * 1000:.1f}ms : {pkg}")
+        count += 1
+    print(f"{count} packages read in {(timer() - t1):.2f}s")
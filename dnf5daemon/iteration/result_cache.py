@@ -0,0 +1,98 @@
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# max. (estimated) size of the cached results
+RESULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# what a result depends on, used for invalidation
+INSTALLED = "installed"
+AVAILABLE = "available"
+
+
+def result_dependencies(method: str, options: dict) -> frozenset[str]:
+    """what the result of method called with options depends on
+
+    packages in the installed scope only change by a transaction, available
+    packages and repos only when the metadata is refreshed. The other scopes
+    (all, upgrades, upgradable) and advisories depends on both.
+    """
+    if method.startswith("rpm."):
+        scope = options.get("scope", "all")
+        if scope == "installed":
+            return frozenset((INSTALLED,))
+        if scope == "available":
+            return frozenset((AVAILABLE,))
+    if method.startswith("repo."):
+        return frozenset((AVAILABLE,))
+    return frozenset((INSTALLED, AVAILABLE))
+
+
+def estimate_size(obj) -> int:
+    """rough size in bytes of a D-Bus result (nested lists, dicts and strings)"""
+    if isinstance(obj, str):
+        return 50 + len(obj)
+    if isinstance(obj, dict):
+        return 100 + sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return 60 + sum(estimate_size(item) for item in obj)
+    return 30
+
+
+class ResultCache:
+    """In-memory LRU cache for query results, bounded by the estimated size
+
+    Every result is stored with what it depends on (INSTALLED and/or AVAILABLE),
+    so a transaction only drops the results depending on the installed
+    packages and a metadata refresh the ones depending on the available ones.
+    The results are shared, so they must not be modified (Dnf5DbusClient hands
+    out copies).
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        # key -> (dependencies, size, result)
+        self._entries: OrderedDict[str, tuple[frozenset[str], int, object]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, key: str, result, dependencies: frozenset[str]) -> None:
+        self.pop(key)
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (dependencies, size, result)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self.size -= size
+
+    def pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def invalidate(self, *dependencies: str) -> None:
+        """drop the results depending on any of dependencies"""
+        keys = [key for key, entry in self._entries.items() if not entry[0].isdisjoint(dependencies)]
+        for key in keys:
+            self.pop(key)
+        logger.debug(f"result cache: {len(keys)} results dropped ({', '.join(dependencies)})")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
@@ -0,0 +1,170 @@
+"""
+Read-only access to the installed packages in the rpm sqlite database
+
+Lists the installed packages directly from rpmdb.sqlite, without dnf5daemon,
+so there is no need to wait for the daemon to load the sack. Only the header
+tags needed are decoded, and the records has the same shape as the records
+from Dnf5DbusClient.package_list_fd(scope="installed").
+
+run: python3 rpmdb.py [path to rpmdb.sqlite]
+"""
+
+import logging
+import sqlite3
+import struct
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+RPMDB_PATH = Path("/var/lib/rpm/rpmdb.sqlite")
+
+# header tags
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_RELEASE = 1002
+RPMTAG_EPOCH = 1003
+RPMTAG_SUMMARY = 1004
+RPMTAG_SIZE = 1009
+RPMTAG_ARCH = 1022
+RPMTAG_LONGSIZE = 5009
+
+# header tag types
+RPM_INT32_TYPE = 4
+RPM_INT64_TYPE = 5
+RPM_STRING_TYPE = 6
+RPM_STRING_ARRAY_TYPE = 8
+RPM_I18NSTRING_TYPE = 9
+
+HEADER_ENTRY = struct.Struct(">iiii")
+
+# list_fd package attribute -> header tags needed for it
+ATTR_TAGS = {
+    "name": (RPMTAG_NAME,),
+    "epoch": (RPMTAG_EPOCH,),
+    "version": (RPMTAG_VERSION,),
+    "release": (RPMTAG_RELEASE,),
+    "arch": (RPMTAG_ARCH,),
+    "summary": (RPMTAG_SUMMARY,),
+    "install_size": (RPMTAG_SIZE, RPMTAG_LONGSIZE),
+    "evr": (RPMTAG_EPOCH, RPMTAG_VERSION, RPMTAG_RELEASE),
+    "nevra": (RPMTAG_NAME, RPMTAG_EPOCH, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_ARCH),
+    "full_nevra": (RPMTAG_NAME, RPMTAG_EPOCH, RPMTAG_VERSION, RPMTAG_RELEASE, RPMTAG_ARCH),
+    "repo_id": (),
+    "is_installed": (),
+}
+
+
+def read_header(blob: bytes, tags: set[int]) -> dict[int, str | int]:
+    """decode the tags from a header blob (as stored in the Packages table)
+
+    only the first value of array tags (like the first language of a
+    i18n string) is decoded.
+    """
+    count, _data_length = struct.unpack_from(">II", blob, 0)
+    data_start = 8 + HEADER_ENTRY.size * count
+    values = {}
+    for tag, tag_type, offset, _count in HEADER_ENTRY.iter_unpack(blob[8:data_start]):
+        if tag not in tags:
+            continue
+        pos = data_start + offset
+        if tag_type in (RPM_STRING_TYPE, RPM_I18NSTRING_TYPE, RPM_STRING_ARRAY_TYPE):
+            values[tag] = blob[pos : blob.index(b"\0", pos)].decode("utf-8", "replace")
+        elif tag_type == RPM_INT32_TYPE:
+            values[tag] = int.from_bytes(blob[pos : pos + 4], "big")
+        elif tag_type == RPM_INT64_TYPE:
+            values[tag] = int.from_bytes(blob[pos : pos + 8], "big")
+    return values
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """open the database read-only"""
+    uri = Path(path).absolute().as_uri()
+    conn = None
+    try:
+        conn = sqlite3.connect(f"{uri}?mode=ro", uri=True)
+        conn.execute("SELECT 1 FROM Packages LIMIT 1")
+        return conn
+    except sqlite3.OperationalError as e:
+        # connect() can succeed and the query fail, don't leak the connection
+        if conn is not None:
+            conn.close()
+        # a database in WAL mode cannot be opened read-only by a normal user,
+        # when the -shm file is not there. Read it as immutable instead.
+        logger.debug(f"rpmdb: opening {path} as immutable ({e})")
+        return sqlite3.connect(f"{uri}?immutable=1", uri=True)
+
+
+def _record(values: dict[int, str | int], package_attrs: list[str]) -> dict:
+    """make a list_fd shaped record from the decoded header values"""
+    name = values.get(RPMTAG_NAME, "")
+    epoch = str(values.get(RPMTAG_EPOCH, 0))
+    version = values.get(RPMTAG_VERSION, "")
+    release = values.get(RPMTAG_RELEASE, "")
+    arch = values.get(RPMTAG_ARCH, "")
+    evr = f"{version}-{release}" if epoch == "0" else f"{epoch}:{version}-{release}"
+    record = {}
+    for attr in package_attrs:
+        if attr == "name":
+            record[attr] = name
+        elif attr == "epoch":
+            record[attr] = epoch
+        elif attr == "version":
+            record[attr] = version
+        elif attr == "release":
+            record[attr] = release
+        elif attr == "arch":
+            record[attr] = arch
+        elif attr == "summary":
+            record[attr] = values.get(RPMTAG_SUMMARY, "")
+        elif attr == "install_size":
+            record[attr] = values.get(RPMTAG_LONGSIZE, values.get(RPMTAG_SIZE, 0))
+        elif attr == "evr":
+            record[attr] = evr
+        elif attr == "nevra":
+            record[attr] = f"{name}-{evr}.{arch}"
+        elif attr == "full_nevra":
+            record[attr] = f"{name}-{epoch}:{version}-{release}.{arch}"
+        elif attr == "repo_id":
+            record[attr] = "@System"
+        elif attr == "is_installed":
+            record[attr] = True
+    return record
+
+
+def installed_packages(package_attrs: list[str] = None, path: Path = RPMDB_PATH):
+    """Generator that yields the installed packages from the rpm database in path
+
+    package_attrs are list_fd package attributes, raises ValueError for the
+    attributes that cannot be read from the database.
+    """
+    package_attrs = package_attrs or ["nevra"]
+    unsupported = [attr for attr in package_attrs if attr not in ATTR_TAGS]
+    if unsupported:
+        raise ValueError(f"package attributes not supported by the rpmdb reader: {unsupported}")
+    # the name and arch are needed to skip the gpg-pubkey pseudo packages
+    tags = {RPMTAG_NAME, RPMTAG_ARCH}
+    for attr in package_attrs:
+        tags.update(ATTR_TAGS[attr])
+    conn = _connect(path)
+    try:
+        for (blob,) in conn.execute("SELECT blob FROM Packages"):
+            values = read_header(blob, tags)
+            if RPMTAG_ARCH not in values:
+                # gpg-pubkey pseudo packages has no arch, dnf don't list them
+                continue
+            yield _record(values, package_attrs)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from timeit import default_timer as timer
+
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else RPMDB_PATH
+    t1 = timer()
+    packages = list(installed_packages(["nevra", "summary", "install_size"], path))
+    t2 = timer()
+    print(f"{len(packages)} installed packages read from {path} in {(t2 - t1):.3f}s")
+    for pkg in packages[:5]:
+        print(f"   {pkg['nevra']:50} {pkg['install_size']:10} {pkg['summary']}")
@@ -0,0 +1,234 @@
+import heapq
+import json
+import logging
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# bump when the file format changes, old index files are ignored
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# where a token was found, a token found in the name ranks higher
+IN_NAME = 4
+IN_SUMMARY = 2
+IN_DESCRIPTION = 1
+# extra score when the query is the package name
+EXACT_NAME = 100
+# the last token is only matched as a prefix from this length, a shorter last
+# token is ignored when there are other tokens (still being typed)
+MIN_PREFIX = 3
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """Inverted index over the name, summary and description of packages
+
+    For every token there is a posting list with the row ids of the packages
+    containing it, and a parallel list telling where (name, summary, description)
+    the token was found, used for ranking. The row id is the position of the
+    package in the list_fd result the index was built from.
+    """
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        # token -> (rows, found in)
+        self._postings: dict[str, tuple[array, array]] = {}
+        # made when needed, reset when packages are added
+        # sorted tokens for prefix lookup
+        self._tokens: list[str] = None
+        # rank of the rows by name, for ranking equal scores
+        self._rank: array = None
+        # lower case name -> row
+        self._names_lower: dict[str, int] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def build(cls, records) -> "SearchIndex":
+        """build the index from list_fd records with name, summary and description"""
+        index = cls()
+        for record in records:
+            index.add(record.get("name", ""), record.get("summary", ""), record.get("description", ""))
+        index.prepare()
+        return index
+
+    def prepare(self) -> None:
+        """make the lookup tables used by search(), so the first search is fast too"""
+        self._prefix_tokens("\uffff")
+        self._name_rank()
+        self._exact_names()
+
+    def add(self, name: str, summary: str, description: str) -> int:
+        """add a package and return its row id"""
+        row = len(self.names)
+        self.names.append(name)
+        self._rank = None
+        self._names_lower = None
+        found: dict[str, int] = {}
+        for where, text in ((IN_NAME, name), (IN_SUMMARY, summary), (IN_DESCRIPTION, description)):
+            for token in tokenize(text):
+                found[token] = found.get(token, 0) | where
+        postings = self._postings
+        for token, where in found.items():
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = (array("I"), array("B"))
+                self._tokens = None
+            posting[0].append(row)
+            posting[1].append(where)
+        return row
+
+    def _prefix_tokens(self, prefix: str) -> list[str]:
+        if len(prefix) < MIN_PREFIX:
+            # too many tokens would match a short prefix, only use the token itself
+            return [prefix] if prefix in self._postings else []
+        if self._tokens is None:
+            self._tokens = sorted(self._postings)
+        tokens = self._tokens
+        result = []
+        ndx = bisect_left(tokens, prefix)
+        while ndx < len(tokens) and tokens[ndx].startswith(prefix):
+            result.append(tokens[ndx])
+            ndx += 1
+        return result
+
+    def _match(self, tokens: list[str], candidates: dict[int, int] | None) -> dict[int, int]:
+        """row -> score for the rows containing any of tokens (and in candidates)"""
+        postings = self._postings
+        matched: dict[int, int] = {}
+        if candidates is None:
+            if len(tokens) == 1:
+                rows, found_in = postings[tokens[0]]
+                return dict(zip(rows, found_in))
+            for token in tokens:
+                rows, found_in = postings[token]
+                for row, where in zip(rows, found_in):
+                    matched[row] = matched.get(row, 0) | where
+            return matched
+        for token in tokens:
+            rows, found_in = postings[token]
+            if len(rows) > 8 * len(candidates):
+                # the posting list is sorted by row, look up the candidates in it
+                for row in candidates:
+                    ndx = bisect_left(rows, row)
+                    if ndx < len(rows) and rows[ndx] == row:
+                        matched[row] = matched.get(row, 0) | found_in[ndx]
+            else:
+                for row, where in zip(rows, found_in):
+                    if row in candidates:
+                        matched[row] = matched.get(row, 0) | where
+        return {row: candidates[row] + where for row, where in matched.items()}
+
+    def _name_rank(self) -> array:
+        """position of each row when sorted by name length and name"""
+        if self._rank is None:
+            names = self.names
+            order = sorted(range(len(names)), key=lambda row: (len(names[row]), names[row]))
+            self._rank = array("I", bytes(4 * len(names)))
+            for rank, row in enumerate(order):
+                self._rank[row] = rank
+        return self._rank
+
+    def search(self, query: str, limit: int = 50) -> list[int]:
+        """return the row ids of the best matching packages
+
+        all tokens in the query must match (AND), the last token is matched as
+        a prefix, so it can be used while typing. A last token shorter than
+        MIN_PREFIX is skipped when there are other tokens ("python d" matches
+        python), only a single short token must match exactly. The packages are
+        ranked by where the tokens were found, an exact name match ranks first.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        *complete, last = tokens
+        groups = [[token] for token in set(complete)]
+        if len(last) >= MIN_PREFIX or not complete:
+            groups.append(self._prefix_tokens(last))
+        postings = self._postings
+        for group in groups:
+            if not group or any(token not in postings for token in group):
+                return []
+        # the most selective tokens first, so the candidate set stays small
+        groups.sort(key=lambda group: sum(len(postings[token][0]) for token in group))
+        scores = None
+        for group in groups:
+            scores = self._match(group, scores)
+            if not scores:
+                return []
+        row = self._exact_names().get(query.strip().lower())
+        if row in scores:
+            scores[row] += EXACT_NAME
+        rank = self._name_rank()
+        size = len(rank)
+        # best score first, shortest name first for the same score
+        return heapq.nsmallest(limit, scores, key=lambda row: (EXACT_NAME + 8 - scores[row]) * size + rank[row])
+
+    def _exact_names(self) -> dict[str, int]:
+        """lower case name -> row"""
+        if self._names_lower is None:
+            self._names_lower = {name.lower(): row for row, name in enumerate(self.names)}
+        return self._names_lower
+
+    def save(self, path: Path, revisions: dict) -> None:
+        """save the index with the repo revisions it was built from"""
+        tokens = list(self._postings)
+        header = {
+            "version": INDEX_VERSION,
+            "revisions": revisions,
+            "names": self.names,
+            "tokens": tokens,
+            "counts": [len(self._postings[token][0]) for token in tokens],
+        }
+        blob = json.dumps(header, separators=(",", ":")).encode()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("<I", len(blob)))
+            f.write(blob)
+            for token in tokens:
+                self._postings[token][0].tofile(f)
+            for token in tokens:
+                self._postings[token][1].tofile(f)
+        os.replace(tmp_path, path)
+        logger.debug(f"search index: saved {len(self.names)} packages, {len(tokens)} tokens in {path}")
+
+    @classmethod
+    def load(cls, path: Path) -> tuple[dict, "SearchIndex"] | None:
+        """return (revisions, index) saved in path or None if there is no usable index"""
+        try:
+            with open(path, "rb") as f:
+                (length,) = struct.unpack("<I", f.read(4))
+                header = json.loads(f.read(length))
+                if header.get("version") != INDEX_VERSION:
+                    return None
+                total = sum(header["counts"])
+                rows = array("I")
+                rows.fromfile(f, total)
+                found_in = array("B")
+                found_in.fromfile(f, total)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, struct.error) as e:
+            logger.warning(f"search index: ignoring broken index {path} ({e})")
+            return None
+        index = cls()
+        index.names = header["names"]
+        start = 0
+        for token, count in zip(header["tokens"], header["counts"]):
+            index._postings[token] = (rows[start : start + count], found_in[start : start + count])
+            start += count
+        index.prepare()
+        return header["revisions"], index
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# wait this long after the last keystroke before querying the daemon
+DEBOUNCE_DELAY = 0.25
+
+
+class SearchScheduler:
+    """Search-as-you-type scheduler for a single view
+
+    Every new query replaces the previous one: the pending (debounced) query
+    is dropped and a running query is cancelled, so there is at most one
+    daemon query in flight. Cancelling the task running Dnf5DbusClient.alist_fd
+    closes the pipe, so the server stops the list_fd transfer. A result is only
+    passed to on_result when no newer query was scheduled in the meantime.
+
+    When refine is given and the new query extends the last query that got a
+    result (like "dnf" -> "dnf5"), the new result is made from the last one by
+    refine(result, query), without asking the daemon again.
+
+        scheduler = SearchScheduler(client.asearch, on_result=view.show_packages)
+        entry.connect("changed", lambda entry: scheduler.schedule(entry.get_text()))
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str], Awaitable[Any]],
+        on_result: Callable[[str, Any], None],
+        delay: float = DEBOUNCE_DELAY,
+        refine: Callable[[Any, str], Any] = None,
+    ) -> None:
+        self.search = search
+        self.on_result = on_result
+        self.delay = delay
+        self.refine = refine
+        self._task: asyncio.Task = None
+        # bumped for every new query, older results are dropped
+        self._generation = 0
+        # last query with a result from the daemon and that result
+        self._last: tuple[str, Any] = None
+        # number of daemon queries started, cancelled while running and refined locally
+        self.started = 0
+        self.cancelled = 0
+        self.refined = 0
+
+    @property
+    def busy(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, query: str) -> asyncio.Task:
+        """schedule a search for query, replacing the one scheduled before"""
+        self.cancel()
+        self._generation += 1
+        self._task = asyncio.get_running_loop().create_task(self._run(query, self._generation))
+        return self._task
+
+    def cancel(self) -> None:
+        """drop the pending query and cancel the running one"""
+        if self.busy:
+            self._task.cancel()
+
+    async def _run(self, query: str, generation: int) -> None:
+        await asyncio.sleep(self.delay)
+        if self.refine is not None and self._last is not None:
+            last_query, last_result = self._last
+            if query.startswith(last_query):
+                self.refined += 1
+                self._deliver(query, self.refine(last_result, query), generation)
+                return
+        self.started += 1
+        logger.debug(f"search: querying daemon for {query!r}")
+        try:
+            result = await self.search(query)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            logger.debug(f"search: {query!r} superseded, cancelled")
+            raise
+        self._last = (query, result)
+        self._deliver(query, result, generation)
+
+    def _deliver(self, query: str, result: Any, generation: int) -> None:
+        if generation != self._generation:
+            logger.debug(f"search: dropping superseded result for {query!r}")
+            return
+        self.on_result(query, result)
+
+
+def refine_by_name(packages: list[dict], query: str) -> list[dict]:
+    """the packages with query in the name, refine for substring searches"""
+    query = query.lower()
+    return [pkg for pkg in packages if query in pkg["name"].lower()]
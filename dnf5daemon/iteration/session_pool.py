@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import dbus
+
+from client import Dnf5DbusClient
+from yumex.utils.exceptions import YumexException
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPool:
+    """A pool of open dnf5daemon sessions with loaded (warm) sacks
+
+    Each session is a Dnf5DbusClient, it is handed out to one user at the time
+    with session(), so read-only queries from several threads can run in
+    parallel on separate sessions. The goal is reset, when a session is given
+    back, and a session is reopened (recycled), when a D-Bus error was raised
+    while it was used or the repo metadata has changed since it was opened.
+
+        with pool.session() as client:
+            updates = client.package_list_fd("*", scope="upgrades")
+
+    Use the plain sync calls (like package_list_fd) from worker threads, the
+    AsyncCaller based calls run a nested main loop and must be called from the
+    main thread.
+    """
+
+    def __init__(self, size: int = 2, profile: str = "full", options: dict = None) -> None:
+        self.size = size
+        self.profile = profile
+        self.options = options or {}
+        self._clients = [Dnf5DbusClient(use_cache=False) for _ in range(size)]
+        self._idle: queue.Queue[Dnf5DbusClient] = queue.Queue()
+        self._lock = threading.Lock()
+        # bumped when the metadata changes, sessions opened before are recycled
+        self._generation = 0
+        self._generations: dict[int, int] = {}
+        # repo revisions of the sessions in the pool
+        self._revisions: dict[str, str] = None
+        self._opened = False
+
+    def open(self) -> None:
+        """open all sessions, the daemon loads the sacks in parallel
+
+        threads calling open (or session) while the sessions are being opened
+        wait for it, so the sessions are opened and queued only once
+        """
+        with self._lock:
+            if self._opened:
+                return
+            with ThreadPoolExecutor(self.size) as executor:
+                list(executor.map(self._open_client, self._clients))
+            for client in self._clients:
+                self._idle.put(client)
+            self._opened = True
+        logger.debug(f"session pool: {self.size} {self.profile} sessions opened")
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients:
+                client.close_session()
+            self._idle = queue.Queue()
+            self._opened = False
+
+    def __enter__(self) -> "SessionPool":
+        self.open()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _open_client(self, client: Dnf5DbusClient) -> None:
+        client.open_session(self.options, self.profile)
+        self._generations[id(client)] = self._generation
+
+    def _recycle(self, client: Dnf5DbusClient) -> None:
+        logger.debug(f"session pool: recycling session {client.session}")
+        client.close_session()
+        self._open_client(client)
+
+    @contextmanager
+    def session(self, timeout: float = None):
+        """use a session from the pool, waits for a free session (max. timeout secs)"""
+        self.open()
+        client = self._idle.get(timeout=timeout)
+        failed = False
+        try:
+            yield client
+        except (dbus.exceptions.DBusException, YumexException):
+            # the client methods raise D-Bus errors as YumexException
+            failed = True
+            raise
+        finally:
+            try:
+                if failed or self._generations.get(id(client)) != self._generation:
+                    self._recycle(client)
+                elif client._connected:
+                    client.session_goal.reset()
+            except (dbus.exceptions.DBusException, YumexException) as e:
+                logger.warning(f"session pool: cannot reuse session ({e}), reopening")
+                self._recycle(client)
+            finally:
+                self._idle.put(client)
+
+    def check_metadata(self) -> bool:
+        """recycle the sessions, if the repo metadata has changed since they were opened
+
+        returns True if the metadata has changed. The idle sessions are recycled
+        now, the ones in use when they are given back.
+        """
+        with self.session() as client:
+            revisions = client.repo_revisions()
+        with self._lock:
+            if self._revisions is None or self._revisions == revisions:
+                self._revisions = revisions
+                return False
+            self._revisions = revisions
+            self._generation += 1
+        logger.debug("session pool: repo metadata changed, recycling sessions")
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for client in idle:
+            try:
+                self._recycle(client)
+            finally:
+                self._idle.put(client)
+        return True
+
+    def query(self, method: str, *args, **kwargs):
+        """call a client method on a free session"""
+        with self.session() as client:
+            return getattr(client, method)(*args, **kwargs)
+
+    def map_queries(self, calls: list[tuple]) -> list:
+        """run (method, args, kwargs) calls in parallel on the sessions, return the results in order"""
+        self.open()
+        with ThreadPoolExecutor(self.size) as executor:
+            futures = [executor.submit(self.query, method, *args, **kwargs) for method, args, kwargs in calls]
+            return [future.result() for future in futures]
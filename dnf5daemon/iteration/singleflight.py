@@ -0,0 +1,99 @@
+import logging
+import threading
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("thread", "nested", "done", "result", "error")
+
+    def __init__(self, nested: bool) -> None:
+        self.thread = threading.get_ident()
+        self.nested = nested
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesce identical calls running at the same time
+
+    The first call for a key runs the function, calls for the same key from
+    other threads, while it is running, wait for it and get the same result
+    (or exception). The result is shared, so it must not be modified.
+
+    A call for the same key from the thread running it (from a nested main
+    loop, like the one in AsyncCaller) cannot wait for the function to return.
+    With do_nested() the function gives the result as soon as it is there, the
+    call waits for it by running the main loop (pump). With do() it is run again.
+    """
+
+    def __init__(self, pump=None) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+        # runs one iteration of the main loop, used by do_nested() on the same thread
+        self.pump = pump
+        # number of calls and calls that shared the result of a running call
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key: str, func, *args, **kwargs):
+        """return func(*args, **kwargs), shared with a running call for key"""
+        return self._do(key, False, func, args, kwargs)
+
+    def do_nested(self, key: str, func, *args, **kwargs):
+        """like do(), for a func running a nested main loop (like AsyncCaller.call)
+
+        func is called with an on_result keyword argument, a function it must
+        call with the result when it is there (from the main loop), before the
+        nested main loop returns.
+        """
+        return self._do(key, True, func, args, kwargs)
+
+    @staticmethod
+    def _publish(call: _Call, result) -> None:
+        if not call.done.is_set():
+            call.result = result
+            call.done.set()
+
+    def _do(self, key: str, nested: bool, func, args, kwargs):
+        nested = nested and self.pump is not None
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call(nested)
+                leader = True
+            elif call.thread == threading.get_ident() and not (nested and call.nested):
+                call = None
+            else:
+                self.saved += 1
+                leader = False
+        if call is None:
+            return func(*args, **kwargs)
+        if not leader:
+            logger.debug(f"single flight: sharing running call {key}")
+            if call.thread == threading.get_ident():
+                # the call is running further down the stack, its reply comes from the main loop
+                while not call.done.is_set():
+                    self.pump()
+            else:
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            if nested:
+                result = func(*args, on_result=partial(self._publish, call), **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            self._publish(call, result)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+
+from client import Dnf5DbusClient
+from gi.events import GLibEventLoopPolicy
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+
+async def list_packages(client: Dnf5DbusClient):
+    count = 0
+    async for pkg in client.alist_fd("*", package_attrs=["nevra", "repo_id"], scope="available"):
+        count += 1
+        if count % 10000 == 0:
+            logger.info(f"Packages received : {count} ({pkg['nevra']})")
+    logger.info(f"Number of available packages : {count}")
+
+
+async def heartbeat():
+    # shows that the loop is not blocked while the packages are received
+    while True:
+        logger.debug("main loop is alive")
+        await asyncio.sleep(0.1)
+
+
+async def first_packages(client: Dnf5DbusClient, number: int):
+    # stop after the first packages, the pipe is closed when leaving the loop
+    async for pkg in client.alist_fd("*", scope="available"):
+        print(pkg["nevra"])
+        number -= 1
+        if not number:
+            break
+
+
+def main():
+    # Set up the GLib event loop
+    policy = GLibEventLoopPolicy()
+    asyncio.set_event_loop_policy(policy)
+    loop = policy.get_event_loop()
+    client = Dnf5DbusClient()
+    client.open_session()
+    beat = loop.create_task(heartbeat())
+    loop.run_until_complete(list_packages(client))
+    loop.run_until_complete(first_packages(client, 5))
+    # cancel a listing while it is running
+    task = loop.create_task(list_packages(client))
+    loop.call_later(0.2, task.cancel)
+    try:
+        loop.run_until_complete(task)
+    except asyncio.CancelledError:
+        logger.info("listing cancelled")
+    beat.cancel()
+    client.close_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import time
+
+from async_client import AsyncDnf5Client
+from gi.events import GLibEventLoopPolicy
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+
+async def sequential(client: AsyncDnf5Client):
+    repos = await client.repo_list()
+    advisories = await client.advisory_list(advisor_attrs=["name", "severity"])
+    updates = await client.package_list("*", scope="upgrades")
+    return repos, advisories, updates
+
+
+async def overlapped(client: AsyncDnf5Client):
+    return await asyncio.gather(
+        client.repo_list(),
+        client.advisory_list(advisor_attrs=["name", "severity"]),
+        client.package_list("*", scope="upgrades"),
+    )
+
+
+def main():
+    policy = GLibEventLoopPolicy()
+    asyncio.set_event_loop_policy(policy)
+    loop = policy.get_event_loop()
+    client = AsyncDnf5Client(use_cache=False)
+    client.open_session()
+    for func in (sequential, overlapped):
+        t_start = time.monotonic()
+        repos, advisories, updates = loop.run_until_complete(func(client))
+        logger.info(
+            f"{func.__name__:10} : {len(repos)} repos, {len(advisories)} advisories, {len(updates)} updates "
+            f"in {time.monotonic() - t_start:.2f}s"
+        )
+    client.close_session()
+
+
+if __name__ == "__main__":
+    main()
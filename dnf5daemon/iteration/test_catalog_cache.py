@@ -0,0 +1,40 @@
+import argparse
+import logging
+from timeit import default_timer as timer
+
+from client import Dnf5DbusClient
+from gi.repository import GLib
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="list all packages using the persistent catalog cache")
+    parser.add_argument("--no-cache", action="store_true", help="don't use the catalog cache")
+    args = parser.parse_args()
+    client = Dnf5DbusClient(use_cache=not args.no_cache)
+    client.open_session()
+    t1 = timer()
+    pkgs = client.package_list_cached(
+        "*",
+        package_attrs=["nevra", "repo_id", "summary"],
+        on_refresh=lambda pkgs: logger.info(f"catalog refreshed : {len(pkgs)} packages"),
+    )
+    t2 = timer()
+    print(f"number of packages: {len(pkgs)}")
+    print(f"execution in {(t2 - t1):.2f}s")
+    # give the background refresh time to finish
+    loop = GLib.MainLoop()
+    GLib.timeout_add_seconds(30, loop.quit)
+    loop.run()
+    client.close_session()
+
+
+if __name__ == "__main__":
+    main()
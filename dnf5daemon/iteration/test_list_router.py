@@ -0,0 +1,39 @@
+import logging
+
+from client import Dnf5DbusClient
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+QUERIES = [
+    (("dnf5",), {}),
+    (("dnf*",), {}),
+    (("*",), {"scope": "upgrades"}),
+    (("*",), {"scope": "installed"}),
+    (("*",), {"package_attrs": ["nevra", "repo_id", "summary"]}),
+]
+
+
+def main():
+    # the caches are off, so every query is a call to the daemon
+    client = Dnf5DbusClient(use_cache=False)
+    client.open_session()
+    # run the queries twice, the second time the rows and timings of the first is used
+    for _ in range(2):
+        for args, kwargs in QUERIES:
+            client.package_list_auto(*args, **kwargs)
+    client.close_session()
+    for record in client.list_router.records:
+        logger.info(
+            f"{record['method']:8} : {record['rows']:6} rows (estimated {record['estimated_rows']:6}) "
+            f"in {record['seconds']:.3f}s  {record['shape']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import logging
+from timeit import default_timer as timer
+
+from client import Dnf5DbusClient
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+PACKAGE_ATTRS = ["nevra", "repo_id", "summary"]
+
+
+def main():
+    client = Dnf5DbusClient()
+    client.open_session()
+    repos, err = client.repo_list()
+    enabled = [str(repo["id"]) for repo in repos if repo["enabled"]]
+    logger.info(f"Enabled repositories : {enabled}")
+
+    # one repo after another
+    t1 = timer()
+    total = 0
+    for repo in enabled:
+        t_repo = timer()
+        pkgs = client.package_list_fd("*", package_attrs=PACKAGE_ATTRS, repo=[repo])
+        total += len(pkgs)
+        print(f"{repo:30} : {len(pkgs):6} pkgs in {(timer() - t_repo):.2f}s")
+    t2 = timer()
+    print(f"sequential : {total} pkgs in {(t2 - t1):.2f}s")
+
+    # all repos at the same time
+    t1 = timer()
+    result = client.package_list_multi("*", repos=enabled, merge=False, package_attrs=PACKAGE_ATTRS)
+    t2 = timer()
+    for repo, pkgs in result.items():
+        print(f"{repo:30} : {len(pkgs):6} pkgs")
+    print(f"concurrent : {sum(len(pkgs) for pkgs in result.values())} pkgs in {(t2 - t1):.2f}s")
+    client.close_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+
+from client import Dnf5DbusClient
+from gi.events import GLibEventLoopPolicy
+from search_scheduler import SearchScheduler, refine_by_name
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+QUERY = "python3-gobject"
+# time between keystrokes
+TYPING_DELAY = 0.08
+
+
+def show_result(query: str, packages: list[dict]):
+    logger.info(f"{query!r} : {len(packages)} packages")
+    for pkg in packages[:5]:
+        print(f"   {pkg['nevra']}")
+
+
+async def type_query(scheduler: SearchScheduler, query: str):
+    # the query is typed one char at the time, like in the search entry
+    for ndx in range(1, len(query) + 1):
+        scheduler.schedule(query[:ndx])
+        await asyncio.sleep(TYPING_DELAY)
+    while scheduler.busy:
+        await asyncio.sleep(0.05)
+
+
+def main():
+    policy = GLibEventLoopPolicy()
+    asyncio.set_event_loop_policy(policy)
+    loop = policy.get_event_loop()
+    client = Dnf5DbusClient()
+    client.open_session()
+    scheduler = SearchScheduler(client.asearch, on_result=show_result, refine=refine_by_name)
+    loop.run_until_complete(type_query(scheduler, QUERY))
+    logger.info(
+        f"{len(QUERY)} keystrokes : {scheduler.started} daemon queries "
+        f"({scheduler.cancelled} cancelled, {scheduler.refined} refined locally)"
+    )
+    client.close_session()
+
+
+if __name__ == "__main__":
+    main()
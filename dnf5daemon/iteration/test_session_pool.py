@@ -0,0 +1,37 @@
+import logging
+import time
+
+from session_pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+QUERIES = [
+    ("package_list_fd", ("*",), {"scope": "installed"}),
+    ("package_list_fd", ("*",), {"scope": "upgrades"}),
+    ("package_list_fd", ("python3*",), {"scope": "available"}),
+]
+
+
+def main():
+    with SessionPool(size=len(QUERIES)) as pool:
+        # the same queries one after the other and in parallel on warm sessions
+        t_start = time.monotonic()
+        for method, args, kwargs in QUERIES:
+            pool.query(method, *args, **kwargs)
+        logger.info(f"sequential : {time.monotonic() - t_start:.2f}s")
+        t_start = time.monotonic()
+        results = pool.map_queries(QUERIES)
+        logger.info(f"parallel   : {time.monotonic() - t_start:.2f}s")
+        for (method, args, kwargs), result in zip(QUERIES, results):
+            logger.info(f"{method}{args} {kwargs} : {len(result)} packages")
+        logger.info(f"metadata changed : {pool.check_metadata()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import logging
+import time
+
+from client import Dnf5DbusClient
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)-6s: (%(name)-5s) -  %(message)s",
+    datefmt="%H:%M:%S",
+)
+
+
+def first_answer(profile: str):
+    # time from opening the session to the list of installed packages
+    client = Dnf5DbusClient(use_cache=False)
+    t_start = time.monotonic()
+    client.open_session(profile=profile)
+    installed = client.package_list_fd("*", package_attrs=["nevra"], scope="installed")
+    logger.info(f"{profile:12} : {len(installed)} installed packages in {time.monotonic() - t_start:.2f}s")
+    return client
+
+
+def main():
+    first_answer("full").close_session()
+    client = first_answer("system-only")
+    # the session is upgraded to full, when the available packages are needed
+    t_start = time.monotonic()
+    updates = client.package_list_fd("*", package_attrs=["nevra"], scope="upgrades")
+    logger.info(f"upgraded to {client.profile} : {len(updates)} updates in {time.monotonic() - t_start:.2f}s")
+    client.close_session()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+dnf5daemon client with a pluggable D-Bus transport
+
+TransportClient has the same calls and result shape with every transport
+backend in transports.py. By default the backend is the fastest one on this
+machine, measured by benchmark() the first time and saved in the cache dir.
+
+dnf5daemon-server is needed, run the benchmark: python3 transport_client.py
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from timeit import default_timer as timer
+
+from jsonstream import read_pipes
+from transports import (
+    ADVISORY_ATTRS,
+    IFACE_ADVISORY,
+    IFACE_GOAL,
+    IFACE_REPO,
+    IFACE_RPM,
+    TRANSPORTS,
+    Transport,
+    available_transports,
+    list_options,
+)
+
+logger = logging.getLogger(__name__)
+
+# a system-only session is enough for the benchmark and loads faster
+BENCHMARK_SESSION = {"load_available_repos": False}
+BENCHMARK_ROUNDS = 3
+
+
+def transport_choice_file() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return Path(cache_home) / "yumex" / "transport.json"
+
+
+class TransportClient:
+    """dnf5daemon client, the D-Bus calls are made by a Transport
+
+    transport is a Transport, the name of one (dbus-python, dasbus, gio) or
+    None to use default_transport()
+    """
+
+    def __init__(self, transport: Transport | str = None) -> None:
+        if transport is None:
+            transport = default_transport()
+        if isinstance(transport, str):
+            transport = TRANSPORTS[transport]()
+        self.transport = transport
+        self.session = None
+
+    def open_session(self, options: dict = None) -> None:
+        if self.session is None:
+            self.session = self.transport.open_session(options or {})
+            logger.debug(f"{self.transport.name}: open session: {self.session}")
+
+    def close_session(self) -> None:
+        if self.session is not None:
+            self.transport.close_session(self.session)
+            logger.debug(f"{self.transport.name}: close session: {self.session}")
+            self.session = None
+
+    def __enter__(self) -> "TransportClient":
+        self.open_session()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close_session()
+
+    def repo_list(self, repo_attrs=None, enable_disable="all") -> list[dict]:
+        if repo_attrs is None:
+            repo_attrs = ["name", "enabled", "priority"]
+        options = {"repo_attrs": repo_attrs, "enable_disable": enable_disable}
+        return self.transport.call(self.session, IFACE_REPO, "list", options)
+
+    def package_list(self, *args, **kwargs) -> list[dict]:
+        """call Rpm.list, *args and **kwargs are the same as for list_options()"""
+        return self.transport.call(self.session, IFACE_RPM, "list", list_options(*args, **kwargs))
+
+    def package_list_fd(self, *args, **kwargs) -> list[dict]:
+        """call Rpm.list_fd, *args and **kwargs are the same as for list_options()"""
+        options = list_options(*args, **kwargs)
+        pipe_r, pipe_w = os.pipe()
+        try:
+            try:
+                self.transport.list_fd(self.session, options, pipe_w)
+            finally:
+                # close the write end - otherwise poll cannot detect the end of transmission
+                os.close(pipe_w)
+            return [pkg for _, objs in read_pipes([pipe_r]) for pkg in objs]
+        finally:
+            os.close(pipe_r)
+
+    def advisory_list(self, *args, **kwargs) -> list[dict]:
+        """*args are the packages the advisories must contain"""
+        options = {
+            "advisory_attrs": kwargs.pop("advisor_attrs", ADVISORY_ATTRS),
+            "contains_pkgs": list(args),
+            "availability": "all",
+        }
+        return self.transport.call(self.session, IFACE_ADVISORY, "list", options)
+
+    def resolve(self, options: dict = None) -> tuple:
+        return self.transport.call(self.session, IFACE_GOAL, "resolve", options or {})
+
+    def do_transaction(self, options: dict = None):
+        options = dict(options or {})
+        options.setdefault("comment", "Yum Extender Transaction")
+        return self.transport.call(self.session, IFACE_GOAL, "do_transaction", options)
+
+
+def _median(func, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        t1 = timer()
+        func()
+        times.append(timer() - t1)
+    return sorted(times)[rounds // 2]
+
+
+def benchmark(names: list[str] = None, rounds: int = BENCHMARK_ROUNDS) -> dict[str, dict[str, float]]:
+    """measure each transport on this machine
+
+    return transport name -> median seconds for a small call (latency), and for
+    listing all installed packages with list and list_fd
+    """
+    results = {}
+    for name in names or available_transports():
+        client = TransportClient(name)
+        client.open_session(BENCHMARK_SESSION)
+        try:
+            results[name] = {
+                "latency": _median(lambda: client.repo_list(["name"]), rounds),
+                "list": _median(lambda: client.package_list("*", scope="installed"), rounds),
+                "list_fd": _median(lambda: client.package_list_fd("*", scope="installed"), rounds),
+            }
+        finally:
+            client.close_session()
+        logger.debug(f"transport benchmark: {name} {results[name]}")
+    return results
+
+
+def fastest(results: dict[str, dict[str, float]]) -> str:
+    """the transport with the lowest total time"""
+    return min(results, key=lambda name: sum(results[name].values()))
+
+
+def default_transport() -> str:
+    """the fastest available transport, the benchmark is run once and the choice saved"""
+    path = transport_choice_file()
+    available = available_transports()
+    try:
+        name = json.loads(path.read_text())["transport"]
+        if name in available:
+            return name
+    except (OSError, ValueError, KeyError):
+        pass
+    if len(available) == 1:
+        return available[0]
+    try:
+        results = benchmark(available)
+    except Exception as e:
+        # no daemon or broken backend, use the first one and try again next time
+        logger.warning(f"transport benchmark failed ({e}), using {available[0]}")
+        return available[0]
+    name = fastest(results)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"transport": name, "results": results, "time": time.time()}))
+    logger.debug(f"transport benchmark: using {name}")
+    return name
+
+
+if __name__ == "__main__":
+    results = benchmark()
+    for name, times in results.items():
+        print(
+            f"{name:12} : call {times['latency'] * 1000:8.2f}ms  list {times['list']:6.2f}s  "
+            f"list_fd {times['list_fd']:6.2f}s"
+        )
+    print(f"fastest : {fastest(results)}")
@@ -0,0 +1,319 @@
+"""
+Transport backends for the dnf5daemon D-Bus API
+
+The same calls can be made with dbus-python, dasbus or Gio (PyGObject). A
+transport takes the method arguments as plain python values (like the options
+made by list_options()) and returns plain python values (dbus-python returns
+its dbus types, they are subclasses of the python types), so the callers don't
+depend on how a backend converts the types.
+
+A backend is only available, when the python module it uses can be imported.
+"""
+
+import abc
+import logging
+import os
+
+try:
+    import dbus
+    from proxy_registry import ProxyRegistry
+except ImportError:
+    dbus = None
+
+try:
+    from dasbus.connection import SystemMessageBus
+    from dasbus.typing import get_native
+    from dasbus.unix import GLibClientUnix
+except ImportError:
+    SystemMessageBus = None
+
+try:
+    from gi.repository import Gio, GLib  # type: ignore
+except ImportError:
+    Gio = GLib = None
+
+logger = logging.getLogger(__name__)
+
+DNFDAEMON_BUS_NAME = "org.rpm.dnf.v0"
+DNFDAEMON_OBJECT_PATH = "/" + DNFDAEMON_BUS_NAME.replace(".", "/")
+
+IFACE_SESSION_MANAGER = "{}.SessionManager".format(DNFDAEMON_BUS_NAME)
+IFACE_REPO = "{}.rpm.Repo".format(DNFDAEMON_BUS_NAME)
+IFACE_RPM = "{}.rpm.Rpm".format(DNFDAEMON_BUS_NAME)
+IFACE_GOAL = "{}.Goal".format(DNFDAEMON_BUS_NAME)
+IFACE_BASE = "{}.Base".format(DNFDAEMON_BUS_NAME)
+IFACE_GROUP = "{}.comps.Group".format(DNFDAEMON_BUS_NAME)
+IFACE_ADVISORY = "{}.Advisory".format(DNFDAEMON_BUS_NAME)
+IFACE_OFFLINE = "{}.Offline".format(DNFDAEMON_BUS_NAME)
+
+# signatures of the method arguments, the proxies are not introspected
+DNFDAEMON_SIGNATURES = {
+    IFACE_SESSION_MANAGER: {"open_session": "a{sv}", "close_session": "o"},
+    IFACE_REPO: {"list": "a{sv}", "confirm_key": "sb", "enable": "as", "disable": "as"},
+    IFACE_RPM: {
+        "list": "a{sv}",
+        "list_fd": "a{sv}h",
+        "install": "asa{sv}",
+        "upgrade": "asa{sv}",
+        "remove": "asa{sv}",
+        "downgrade": "asa{sv}",
+        "reinstall": "asa{sv}",
+        "distro_sync": "asa{sv}",
+        "system_upgrade": "a{sv}",
+    },
+    IFACE_GOAL: {"resolve": "a{sv}", "do_transaction": "a{sv}"},
+    IFACE_BASE: {"clean": "s"},
+    IFACE_GROUP: {"list": "a{sv}"},
+    IFACE_ADVISORY: {"list": "a{sv}"},
+    IFACE_OFFLINE: {"set_finish_action": "s"},
+}
+
+# the daemon can take a long time (like in do_transaction)
+CALL_TIMEOUT = 60 * 20
+
+# advisory_attrs of Advisory.list, when advisory_list is not given advisor_attrs
+ADVISORY_ATTRS = ["advisoryid", "name", "title", "type", "severity"]
+
+
+def list_options(*args, **kwargs) -> dict:
+    """build the options for the org.rpm.dnf.v0.rpm.Rpm list and list_fd methods
+
+    *args is package patterns to match
+    **kwargs can contain other options like package_attrs, repo or scope
+    """
+    options = {}
+    options["patterns"] = list(args)
+    options["package_attrs"] = list(kwargs.pop("package_attrs", ["nevra"]))
+    options["with_src"] = False
+    options["with_provides"] = kwargs.pop("with_provides", False)
+    options["with_filenames"] = kwargs.pop("with_filenames", False)
+    options["with_binaries"] = kwargs.pop("with_binaries", False)
+    options["icase"] = True
+    options["latest-limit"] = kwargs.pop("latest_limit", 1)
+    # limit packages to one of “all”, “installed”, “available”, “upgrades”, “upgradable”
+    options["scope"] = kwargs.pop("scope", "all")
+    if "repo" in kwargs:
+        options["repo"] = list(kwargs.pop("repo"))
+    if "arch" in kwargs:
+        options["arch"] = list(kwargs.pop("arch"))
+    return options
+
+
+def _variant_type(value) -> str:
+    # bool first, it is a subclass of int
+    if isinstance(value, bool):
+        return "b"
+    if isinstance(value, int):
+        return "i"
+    if isinstance(value, str):
+        return "s"
+    if isinstance(value, dict):
+        return "a{sv}"
+    if isinstance(value, (list, tuple)):
+        return "as"
+    raise TypeError(f"cannot send {value!r} in a D-Bus variant")
+
+
+def to_dbus(value):
+    """a{sv} options (or a value in them) with the dbus-python types
+
+    the variant types cannot be guessed from empty lists
+    """
+    if isinstance(value, dict):
+        return dbus.Dictionary({key: to_dbus(item) for key, item in value.items()}, signature="sv")
+    if isinstance(value, (list, tuple)):
+        return dbus.Array(value, signature="s")
+    return value
+
+
+def from_dbus(value):
+    """a reply from a dbus-python call (like Rpm.list) with the plain python types
+
+    the dbus types are subclasses of the python types, but they compare, pickle
+    and serialize (with their variant_level) differently.
+    """
+    if isinstance(value, dict):
+        return {from_dbus(key): from_dbus(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [from_dbus(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(from_dbus(item) for item in value)
+    # bool first, dbus.Boolean is a subclass of int
+    if isinstance(value, (bool, dbus.Boolean)):
+        return bool(value)
+    for python_type in (int, float, str, bytes):
+        if isinstance(value, python_type):
+            return python_type(value)
+    return value
+
+
+def to_variants(options: dict) -> dict:
+    """a{sv} options with the values as GLib.Variant (for dasbus and Gio)"""
+    return {
+        key: GLib.Variant("a{sv}", to_variants(value))
+        if isinstance(value, dict)
+        else GLib.Variant(_variant_type(value), value)
+        for key, value in options.items()
+    }
+
+
+def _split_signature(signature: str) -> list[str]:
+    """split a signature in the complete types, like "asa{sv}h" -> ["as", "a{sv}", "h"]"""
+    types = []
+    ndx = 0
+    while ndx < len(signature):
+        start = ndx
+        while signature[ndx] == "a":
+            ndx += 1
+        if signature[ndx] in "({":
+            depth = 0
+            while True:
+                depth += signature[ndx] in "({"
+                depth -= signature[ndx] in ")}"
+                ndx += 1
+                if not depth:
+                    break
+        else:
+            ndx += 1
+        types.append(signature[start:ndx])
+    return types
+
+
+class Transport(abc.ABC):
+    """a way to call the dnf5daemon D-Bus methods"""
+
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        return False
+
+    @abc.abstractmethod
+    def call(self, path: str, interface: str, method: str, *args):
+        """call method and return the result (a tuple for more than one return value)"""
+
+    def list_fd(self, path: str, options: dict, fd: int) -> str:
+        """call Rpm.list_fd with the write end of a pipe, return the transfer id"""
+        return self.call(path, IFACE_RPM, "list_fd", options, fd)
+
+    def open_session(self, options: dict) -> str:
+        return str(self.call(DNFDAEMON_OBJECT_PATH, IFACE_SESSION_MANAGER, "open_session", options))
+
+    def close_session(self, session: str) -> bool:
+        return bool(self.call(DNFDAEMON_OBJECT_PATH, IFACE_SESSION_MANAGER, "close_session", session))
+
+
+class DbusPythonTransport(Transport):
+    """dbus-python, with the introspection-free proxies"""
+
+    name = "dbus-python"
+
+    @classmethod
+    def available(cls) -> bool:
+        return dbus is not None
+
+    def __init__(self) -> None:
+        self.proxies = ProxyRegistry(dbus.SystemBus(), DNFDAEMON_BUS_NAME, DNFDAEMON_SIGNATURES)
+
+    def call(self, path: str, interface: str, method: str, *args):
+        proxy = self.proxies.interface(path, interface)
+        args = [to_dbus(arg) for arg in args]
+        # plain python types, like the dasbus and Gio transports return
+        return from_dbus(getattr(proxy, method)(*args, timeout=CALL_TIMEOUT))
+
+
+class DasbusTransport(Transport):
+    """dasbus, the GLib.Variant results are converted with get_native"""
+
+    name = "dasbus"
+
+    @classmethod
+    def available(cls) -> bool:
+        return SystemMessageBus is not None
+
+    def __init__(self) -> None:
+        self.bus = SystemMessageBus()
+        self._proxies = {}
+
+    def _proxy(self, path: str, interface: str):
+        proxy = self._proxies.get((path, interface))
+        if proxy is None:
+            proxy = self._proxies[(path, interface)] = self.bus.get_proxy(
+                DNFDAEMON_BUS_NAME, path, interface_name=interface, client=GLibClientUnix
+            )
+        return proxy
+
+    def call(self, path: str, interface: str, method: str, *args):
+        args = [to_variants(arg) if isinstance(arg, dict) else arg for arg in args]
+        result = getattr(self._proxy(path, interface), method)(*args, timeout=CALL_TIMEOUT * 1000)
+        return get_native(result)
+
+
+class GioTransport(Transport):
+    """Gio.DBusConnection calls, without proxies"""
+
+    name = "gio"
+
+    @classmethod
+    def available(cls) -> bool:
+        return Gio is not None
+
+    def __init__(self) -> None:
+        self.conn = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+
+    def _parameters(self, interface: str, method: str, args) -> "GLib.Variant":
+        signature = DNFDAEMON_SIGNATURES.get(interface, {}).get(method, "")
+        values = [
+            to_variants(arg) if arg_type == "a{sv}" else arg for arg_type, arg in zip(_split_signature(signature), args)
+        ]
+        return GLib.Variant(f"({signature})", tuple(values))
+
+    @staticmethod
+    def _result(result: "GLib.Variant"):
+        values = result.unpack()
+        return values[0] if len(values) == 1 else values
+
+    def call(self, path: str, interface: str, method: str, *args):
+        result = self.conn.call_sync(
+            DNFDAEMON_BUS_NAME,
+            path,
+            interface,
+            method,
+            self._parameters(interface, method, args),
+            None,
+            Gio.DBusCallFlags.NONE,
+            CALL_TIMEOUT * 1000,
+            None,
+        )
+        return self._result(result)
+
+    def list_fd(self, path: str, options: dict, fd: int) -> str:
+        # the fd is passed in a fd list, the h argument is the index in the list.
+        # append() adds a copy of fd, it is closed after the call, so the
+        # reader can see the end of the transfer
+        fd_list = Gio.UnixFDList.new()
+        fd_list.append(fd)
+        try:
+            result, _ = self.conn.call_with_unix_fd_list_sync(
+                DNFDAEMON_BUS_NAME,
+                path,
+                IFACE_RPM,
+                "list_fd",
+                self._parameters(IFACE_RPM, "list_fd", (options, 0)),
+                None,
+                Gio.DBusCallFlags.NONE,
+                CALL_TIMEOUT * 1000,
+                fd_list,
+                None,
+            )
+        finally:
+            for copy in fd_list.steal_fds():
+                os.close(copy)
+        return self._result(result)
+
+
+TRANSPORTS = {transport.name: transport for transport in (DbusPythonTransport, DasbusTransport, GioTransport)}
+
+
+def available_transports() -> list[str]:
+    return [name for name, transport in TRANSPORTS.items() if transport.available()]
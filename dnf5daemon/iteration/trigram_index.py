@@ -0,0 +1,83 @@
+import re
+from array import array
+from fnmatch import translate
+
+# glob wildcards, the literal parts between them are used for the trigrams
+WILDCARD_RE = re.compile(r"\*|\?|\[[^\]]*\]?")
+# marks the begin and end of a name, so anchored patterns get more trigrams
+BEGIN = "\x02"
+END = "\x03"
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[ndx : ndx + 3] for ndx in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Trigram index over package names for glob and substring matching
+
+    For every trigram of the (lower case) names there is a posting list with
+    the row ids of the names containing it. A glob is planned into the trigrams
+    its literal parts must contain, the posting lists are intersected and the
+    remaining candidates are verified against the glob.
+    """
+
+    def __init__(self, names: list[str]) -> None:
+        self.names = names
+        self._lower = [name.lower() for name in names]
+        self._postings: dict[str, array] = {}
+        for row, name in enumerate(self._lower):
+            for trigram in trigrams(f"{BEGIN}{name}{END}"):
+                posting = self._postings.get(trigram)
+                if posting is None:
+                    posting = self._postings[trigram] = array("I")
+                posting.append(row)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def plan(pattern: str) -> set[str]:
+        """the trigrams a name must contain to match the (lower case) glob pattern"""
+        text = f"{BEGIN}{pattern}{END}"
+        needed = set()
+        for literal in WILDCARD_RE.split(text):
+            needed |= trigrams(literal)
+        return needed
+
+    def candidates(self, pattern: str) -> list[int] | range:
+        """row ids of the names that can match the glob pattern"""
+        needed = self.plan(pattern.lower())
+        if not needed:
+            # no literal part long enough, every name is a candidate
+            return range(len(self.names))
+        postings = []
+        for trigram in needed:
+            posting = self._postings.get(trigram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        rows = set(postings[0])
+        for posting in postings[1:]:
+            rows.intersection_update(posting)
+            if not rows:
+                return []
+        return sorted(rows)
+
+    def glob(self, pattern: str, icase: bool = True) -> list[int]:
+        """row ids of the names matching the glob pattern (like QueryCmp_IGLOB)
+
+        a pattern without wildcards matches the name exactly, use *foo* for a substring.
+        """
+        if icase:
+            match = re.compile(translate(pattern.lower())).match
+            names = self._lower
+        else:
+            match = re.compile(translate(pattern)).match
+            names = self.names
+        return [row for row in self.candidates(pattern) if match(names[row])]
+
+    def substring(self, text: str) -> list[int]:
+        """row ids of the names containing text (case insensitive)"""
+        return self.glob(f"*{text}*")
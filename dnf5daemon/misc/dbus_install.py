@@ -9,6 +9,8 @@ from dasbus.loop import EventLoop
 from dasbus.error import DBusError
 from gi.repository import GLib
 
+from variant_rows import VariantRows, call_variant
+
 
 # Constants
 SYSTEM_BUS = SystemMessageBus()
@@ -91,12 +93,13 @@ class Dnf5Client:
         """
         return partial(self.async_dbus.call, getattr(self.session, method))
 
-    def package_list(self, *args, **kwargs) -> list[list[str]]:
+    def package_list(self, *args, **kwargs) -> VariantRows:
         """call the org.rpm.dnf.v0.rpm.Repo list method
 
         *args is package patterns to match
         **kwargs can contain other options like package_attrs, repo or scope
 
+        returns a lazy list of the packages, the fields are decoded when used
         """
         options = {}
         options["patterns"] = gv_list(args)
@@ -107,9 +110,16 @@ class Dnf5Client:
             options["repo"] = gv_list(kwargs.pop("repo"))
         if "scope" in kwargs:
             options["scope"] = gv_str(kwargs.pop("scope"))
-        # get and async partial function
-        get_list = self._async_method("list")
-        result = get_list(options)
+        # the reply is kept as one GLib.Variant, the rows are decoded when used
+        reply = call_variant(
+            SYSTEM_BUS.connection,
+            DNFDBUS.service_name,
+            self.session_path,
+            "org.rpm.dnf.v0.rpm.Rpm",
+            "list",
+            GLib.Variant("(a{sv})", (options,)),
+        )
+        # aa{sv}
         # [{
         #   "id": GLib.Variant(),
         #   "nevra": GLib.Variant("s", nevra),
@@ -117,9 +127,7 @@ class Dnf5Client:
         #   },
         #   {....},
         # ]
-        return [
-            [value.get_string() for value in list(elem.values())[1:]] for elem in result
-        ]
+        return VariantRows(reply.get_child_value(0))
 
 
 # dnf5daemon-server is needed to work
@@ -134,7 +142,8 @@ if __name__ == "__main__":
             repo=["fedora", "updates"],
         )
         print(f"Found : {len(pkgs)}")
-        for (nevra, repo) in pkgs:
+        for pkg in pkgs:
+            nevra, repo = pkg["nevra"], pkg["repo_id"]
             print(f"FOUND: {nevra:40} repo: {repo}")
             print("installing")
             to_inst = gv_list([nevra])
@@ -11,6 +11,8 @@ from dasbus.loop import EventLoop
 from dasbus.typing import get_native, get_variant
 from gi.repository import GLib
 
+from variant_rows import VariantRows, call_variant
+
 # Constants
 SYSTEM_BUS = SystemMessageBus()
 DNFDBUS_NAMESPACE = ("org", "rpm", "dnf", "v0")
@@ -110,12 +112,13 @@ class Dnf5Client:
         )
         return get_native(repos)
 
-    def package_list(self, *args, **kwargs) -> list[list[str]]:
+    def package_list(self, *args, **kwargs) -> VariantRows:
         """call the org.rpm.dnf.v0.rpm.Repo list method
 
         *args is package patterns to match
         **kwargs can contain other options like package_attrs, repo or scope
 
+        returns a lazy list of the packages (use to_native() to get python dicts)
         """
         package_attrs = kwargs.pop("package_attrs", ["nevra"])
         options = {}
@@ -129,9 +132,16 @@ class Dnf5Client:
         # limit packages to one of “all”, “installed”, “available”, “upgrades”, “upgradable”
         if "scope" in kwargs:
             options["scope"] = get_variant(str, kwargs.pop("scope"))
-        # get and async partial function
-        get_list = self._async_method("list", self.session_rpm)
-        result = get_list(options)
+        # the reply is kept as one GLib.Variant, the rows are decoded when used
+        reply = call_variant(
+            SYSTEM_BUS.connection,
+            DNFDBUS.service_name,
+            self.session_path,
+            "org.rpm.dnf.v0.rpm.Rpm",
+            "list",
+            GLib.Variant("(a{sv})", (options,)),
+        )
+        # aa{sv}
         # [{
         #   "id": GLib.Variant(),
         #   "nevra": GLib.Variant("s", nevra),
@@ -139,8 +149,7 @@ class Dnf5Client:
         #   },
         #   {....},
         # ]
-
-        return get_native(result)
+        return VariantRows(reply.get_child_value(0))
 
     def read_dbus_file(self, file_descriptor):
         """Read data from a D-Bus file descriptor."""
@@ -250,9 +259,7 @@ if __name__ == "__main__":
             fmt_str += f"{attr}: " + "{" + f"{attr}" + "}"
 
         for i in range(0, 5):
-            pkg = pkgs[-i]
-            pkg.pop("id")
-            print(fmt_str.format(pkg))
+            print(fmt_str.format(**pkgs[-i]))
 
         # for pkg in pkgs:
         #     # print(pkg)
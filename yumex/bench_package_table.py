@@ -0,0 +1,114 @@
+"""
+Memory benchmark for the PackageTable storage of YumexPackage
+
+Compares the memory used for 70k available and 3k installed packages, stored as
+one object per package (the YumexPackage before the PackageTable), stored
+in a PackageTable and made one at a time without a table (StandalonePackage),
+and times sorting the packages by evr.
+
+run: python3 -m yumex.bench_package_table
+"""
+
+import random
+import tracemalloc
+from operator import attrgetter
+from timeit import default_timer as timer
+
+from yumex.dataclass import PackageState, PackageTable, YumexPackage
+
+AVAILABLE = 70_000
+INSTALLED = 3_000
+REPOS = ["fedora", "updates", "updates-testing", "rpmfusion-free", "copr:tim:yumex"]
+ARCHS = ["x86_64", "noarch", "i686"]
+
+
+class LegacyPackage:
+    """the YumexPackage with a full python object per package"""
+
+    def __init__(self, *args, **kwargs):
+        self.name: str = kwargs.pop("name")
+        self.arch: str = kwargs.pop("arch")
+        self.epoch: str = kwargs.pop("epoch")
+        self.release: str = kwargs.pop("release")
+        self.version: str = kwargs.pop("version")
+        self.repo: str = kwargs.pop("repo")
+        self.description: str = kwargs.pop("description")
+        self.sizeB: int = kwargs.pop("size")
+        self.state: PackageState = kwargs.pop("state", PackageState.AVAILABLE)
+        self.action = 0
+        self.is_dep: bool = False
+        self.ref_to = None
+        self.queued: bool = False
+        self.queue_action: bool = False
+
+
+def make_records(number: int, installed: bool) -> list[dict]:
+    """make records like the ones returned by list_fd, every string is a new object (like decoded json)"""
+    records = []
+    for i in range(number):
+        records.append(
+            {
+                "name": f"package-{i}",
+                "epoch": str(i % 2),
+                "version": f"{i % 50}.{i % 7}",
+                "release": f"{i % 3}.fc41",
+                "arch": ARCHS[i % len(ARCHS)].encode().decode(),
+                "repo_id": REPOS[i % len(REPOS)].encode().decode(),
+                "summary": f"Summary for package-{i}",
+                "install_size": i * 1024,
+                "is_installed": installed,
+            }
+        )
+    return records
+
+
+def build_legacy(records: list[dict]) -> list:
+    return [
+        LegacyPackage(
+            name=rec["name"],
+            arch=rec["arch"],
+            epoch=rec["epoch"],
+            release=rec["release"],
+            version=rec["version"],
+            repo=rec["repo_id"],
+            description=rec["summary"],
+            size=rec["install_size"],
+            state=PackageState.INSTALLED if rec["is_installed"] else PackageState.AVAILABLE,
+        )
+        for rec in records
+    ]
+
+
+def build_table(records: list[dict]) -> PackageTable:
+    table = PackageTable()
+    table.add_records(records)
+    return table
+
+
+def build_single(records: list[dict]) -> list:
+    """packages made without a table (StandalonePackage), like the existing from_* callers"""
+    return [YumexPackage.from_record(rec) for rec in records]
+
+
+def measure(build, records: list[dict]) -> None:
+    tracemalloc.start()
+    t1 = timer()
+    result = build(records)
+    t2 = timer()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{build.__name__:15} : {len(result)} packages {current / 1024 / 1024:6.1f} MB in {(t2 - t1):.2f}s")
+
+
+if __name__ == "__main__":
+    records = make_records(AVAILABLE, False) + make_records(INSTALLED, True)
+    # the records themselves are not counted, only what is added by the build
+    measure(build_legacy, records)
+    measure(build_table, records)
+    measure(build_single, records)
+    pkgs = list(build_table(records))
+    random.shuffle(pkgs)
+    t1 = timer()
+    pkgs.sort(key=attrgetter("evr_key"))
+    t2 = timer()
+    print(f"sort by evr     : {len(pkgs)} packages in {(t2 - t1):.2f}s")
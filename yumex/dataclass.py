@@ -1,129 +1,649 @@
-from dataclasses import dataclass
-from typing import Any, Union
-from enum import IntEnum
-
-
-class PackageState(IntEnum):
-    UPDATE = 1
-    AVAILABLE = 2
-    INSTALLED = 3
-    DOWNGRADE = 4
-
-
-class PackageAction(IntEnum):
-    NONE = 0
-    DOWNGRADE = 10
-    UPGRADE = 20
-    INSTALL = 30
-    REINSTALL = 40
-    ERASE = 50
-
-
-class GObject:
-    type = "Gobject"
-
-class YumexPackage(GObject):
-
-    def __init__(self, *args, **kwargs):
-        super(YumexPackage, self).__init__()
-        self.name:str = kwargs.pop("name")
-        self.arch:str = kwargs.pop("arch")
-        self.epoch:str = kwargs.pop("epoch")
-        self.release:str= kwargs.pop("release")
-        self.version:str= kwargs.pop("version")
-        self.repo:str= kwargs.pop("repo")
-        self.description:str= kwargs.pop("description")
-        self.sizeB:int= kwargs.pop("size")
-        self.state:PackageState = kwargs.pop("state",PackageState.AVAILABLE)
-        self.action:PackageAction = kwargs.pop("state",PackageAction.NONE)
-        self.is_dep:bool = False
-        self.ref_to:YumexPackage = None
-        self.queued:bool = False
-        self.queue_action:bool = False
-    
-    @classmethod
-    def from_dnf4(cls, pkg):
-        return cls(
-            name=pkg.name, 
-            arch=pkg.arch,
-            epoch=pkg.epoch,
-            release=pkg.release, 
-            version=pkg.version, 
-            repo=pkg.reponame, 
-            description=pkg.summary,
-            size=int(pkg.size),
-        )
-
-    @classmethod
-    def from_dnf5(cls, pkg):
-        if pkg.is_installed():
-            state = PackageState.INSTALLED
-        else:
-            state = PackageState.AVAILABLE
-        return cls(
-            name=pkg.get_name(), 
-            arch=pkg.get_arch(),
-            epoch=pkg.get_epoch(),
-            release=pkg.get_release(), 
-            version=pkg.get_version(), 
-            repo=pkg.get_repo_id(), 
-            description=pkg.get_summary(),
-            size=pkg.get_install_size(),
-            state=state,
-        )
-
-    @property
-    def installed(self):
-        return self.state == PackageState.INSTALLED
-
-    def set_installed(self):
-        self.repo = f"@{self.repo}"
-        self.state = PackageState.INSTALLED
-
-    def set_update(self, inst_pkg):
-        self.ref_to = YumexPackage.from_dnf4(inst_pkg)
-        self.ref_to.state = PackageState.INSTALLED
-        self.state = PackageState.UPDATE
-
-#     @property
-#     def size(self):
-#         return format_number(self.sizeB)
-
-    # @property
-    # def styles(self):
-    #     match self.state:
-    #         case PackageState.INSTALLED:
-    #             return ["success"]
-    #         case PackageState.UPDATE:
-    #             return ["error"]
-    #     return []
-
-    @property
-    def evr(self):
-        if self.epoch:
-            return f"{self.epoch}:{self.version}-{self.release}"
-        else:
-            return f"{self.version}-{self.release}"
-
-    @property
-    def nevra(self):
-        return f"{self.name}-{self.evr}.{self.arch}"
-
-    def __str__(self) -> str:
-        return f"YumexPackage({self.nevra} : {self.repo})"
-
-    def __eq__(self, other) -> bool:
-        return self.nevra == other.nevra
-
-    @property
-    def id(self):
-        nevra_r = (
-            self.name,
-            self.epoch,
-            self.version,
-            self.release,
-            self.arch,
-            self.repo[1:],
-        )
-        return ",".join([str(elem) for elem in nevra_r])    
-
+import sys
+from array import array
+from enum import IntEnum
+
+from yumex.nevra import split_nevra
+from yumex.rpmvercmp import evr_key
+
+
+class PackageState(IntEnum):
+    UPDATE = 1
+    AVAILABLE = 2
+    INSTALLED = 3
+    DOWNGRADE = 4
+
+
+class PackageAction(IntEnum):
+    NONE = 0
+    DOWNGRADE = 10
+    UPGRADE = 20
+    INSTALL = 30
+    REINSTALL = 40
+    ERASE = 50
+
+
+class GObject:
+    __slots__ = ()
+    type = "Gobject"
+
+
+class EncodedColumn:
+    """Dictionary encoded column
+
+    Each row stores a small integer code, the distinct values are only stored once.
+    Used for columns with few distinct values like repo, arch and epoch.
+    """
+
+    def __init__(self) -> None:
+        self.values: list = []
+        self._codes: dict = {}
+        self.rows = array("H")
+
+    def encode(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def append(self, value) -> None:
+        self.rows.append(self.encode(value))
+
+    def __getitem__(self, row: int):
+        return self.values[self.rows[row]]
+
+    def __setitem__(self, row: int, value) -> None:
+        self.rows[row] = self.encode(value)
+
+
+def normalize_epoch(epoch) -> str:
+    """the epoch as a string, "0" for no epoch (dnf4 has int epochs, nevra strings no 0 epoch)"""
+    return str(epoch) if epoch else "0"
+
+
+def dnf4_fields(pkg) -> tuple:
+    """the PackageTable.add() arguments (in order) for a dnf4 package"""
+    return pkg.name, pkg.arch, pkg.epoch, pkg.release, pkg.version, pkg.reponame, pkg.summary, pkg.size
+
+
+def dnf5_fields(pkg) -> tuple:
+    """the PackageTable.add() arguments (in order) for a libdnf5 package"""
+    if pkg.is_installed():
+        state = PackageState.INSTALLED
+    else:
+        state = PackageState.AVAILABLE
+    return (
+        pkg.get_name(),
+        pkg.get_arch(),
+        pkg.get_epoch(),
+        pkg.get_release(),
+        pkg.get_version(),
+        pkg.get_repo_id(),
+        pkg.get_summary(),
+        pkg.get_install_size(),
+        state,
+    )
+
+
+def record_fields(record: dict) -> tuple:
+    """the PackageTable.add() arguments (in order) for a dnf5daemon list/list_fd result
+
+    the record must contain repo_id, summary, install_size and is_installed
+    package attrs and name, epoch, version, release, arch or just nevra/full_nevra
+    """
+    if record.get("is_installed"):
+        state = PackageState.INSTALLED
+    else:
+        state = PackageState.AVAILABLE
+    if "name" in record:
+        name, epoch, version, release, arch = (
+            record["name"],
+            record["epoch"],
+            record["version"],
+            record["release"],
+            record["arch"],
+        )
+    else:
+        # only the nevra was requested from the daemon
+        name, epoch, version, release, arch = split_nevra(record.get("nevra") or record["full_nevra"])
+    return (
+        name,
+        arch,
+        epoch,
+        release,
+        version,
+        record["repo_id"],
+        record.get("summary", ""),
+        record.get("install_size", 0),
+        state,
+    )
+
+
+def package_fields(pkg) -> tuple:
+    """the PackageTable.add() arguments (in order) for a dnf4 package, a libdnf5 package or a list_fd record"""
+    if isinstance(pkg, dict):
+        return record_fields(pkg)
+    if hasattr(pkg, "get_name"):
+        return dnf5_fields(pkg)
+    return dnf4_fields(pkg)
+
+
+class PackageTable:
+    """Column wise storage for packages
+
+    A package is a row id in the table. Strings with few distinct values are
+    dictionary encoded, version and release are interned and the numeric fields
+    are stored in arrays, so there are no per package objects. YumexPackage is a
+    light view on a row, package(row) makes a new view, the views of a row share
+    the evr/nevra/id keys cached in the table.
+
+    Use a table for each result set (like a list refresh) and drop or clear()
+    it with the result, the rows are only freed with the table.
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        """remove all packages, the views on the rows must not be used after this"""
+        self.names: list[str] = []
+        self.versions: list[str] = []
+        self.releases: list[str] = []
+        self.descriptions: list[str] = []
+        self.epochs = EncodedColumn()
+        self.archs = EncodedColumn()
+        self.repos = EncodedColumn()
+        self.sizes = array("q")
+        self.states = array("B")
+        self.actions = array("B")
+        self.is_dep = array("B")
+        self.queued = array("B")
+        self.queue_action = array("B")
+        # installed package referenced by an update (sparse, row -> package)
+        self.ref_to: dict[int, "YumexPackage"] = {}
+        # keys made on first use (None until then), reset when a column they are made of changes
+        self.evrs: list[str] = []
+        self.evr_keys: list[tuple] = []
+        self.nevras: list[str] = []
+        self.ids: list[str] = []
+        # nevra -> row, made by find()/by_nevra(), updated by add() and set_nevra_part()
+        self._nevra_index: dict[str, int] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self):
+        for row in range(len(self.names)):
+            yield self.package(row)
+
+    def package(self, row: int) -> "YumexPackage":
+        return YumexPackage(table=self, row=row)
+
+    def _nevra_rows(self) -> dict[str, int]:
+        if self._nevra_index is None:
+            self._nevra_index = {self.package(row).nevra: row for row in range(len(self.names))}
+        return self._nevra_index
+
+    def find(self, nevra: str) -> "YumexPackage":
+        """the package with nevra (the last one added or changed), None if not in the table"""
+        row = self._nevra_rows().get(nevra)
+        return None if row is None else self.package(row)
+
+    def by_nevra(self) -> dict[str, "YumexPackage"]:
+        """return a nevra -> package dict of the packages in the table (duplicates removed)
+
+        it is a snapshot, the nevra index behind it is kept up to date with the
+        added and changed rows.
+        """
+        return {nevra: self.package(row) for nevra, row in self._nevra_rows().items()}
+
+    def set_nevra_part(self, column: str, row: int, value) -> None:
+        """set a column the nevra is made of (name, epoch, version, release or arch)
+
+        the cached keys of row are dropped and its nevra index entry is moved to the new nevra
+        """
+        index = self._nevra_index
+        old_nevra = self.package(row).nevra if index is not None else None
+        getattr(self, column)[row] = value
+        self.evrs[row] = self.evr_keys[row] = self.nevras[row] = self.ids[row] = None
+        if index is not None:
+            if index.get(old_nevra) == row:
+                del index[old_nevra]
+            index[self.package(row).nevra] = row
+
+    def set_repo(self, row: int, repo: str) -> None:
+        """set the repo of row, only the id is made from it"""
+        self.repos[row] = repo
+        self.ids[row] = None
+
+    def add(
+        self,
+        name: str,
+        arch: str,
+        epoch: str,
+        release: str,
+        version: str,
+        repo: str,
+        description: str,
+        size: int,
+        state: PackageState = PackageState.AVAILABLE,
+        action: PackageAction = PackageAction.NONE,
+    ) -> int:
+        """add a package and return its row id"""
+        row = len(self.names)
+        self.names.append(name)
+        self.archs.append(arch)
+        self.epochs.append(normalize_epoch(epoch))
+        self.releases.append(sys.intern(release))
+        self.versions.append(sys.intern(version))
+        self.repos.append(repo)
+        self.descriptions.append(description)
+        self.sizes.append(int(size))
+        self.states.append(state)
+        self.actions.append(action)
+        self.is_dep.append(False)
+        self.queued.append(False)
+        self.queue_action.append(False)
+        self.evrs.append(None)
+        self.evr_keys.append(None)
+        self.nevras.append(None)
+        self.ids.append(None)
+        if self._nevra_index is not None:
+            self._nevra_index[self.package(row).nevra] = row
+        return row
+
+    def add_dnf4(self, pkg) -> int:
+        return self.add(*dnf4_fields(pkg))
+
+    def add_dnf5(self, pkg) -> int:
+        return self.add(*dnf5_fields(pkg))
+
+    def add_record(self, record: dict) -> int:
+        """add a package from a dnf5daemon list/list_fd result (see record_fields)"""
+        return self.add(*record_fields(record))
+
+    def add_package(self, pkg) -> int:
+        """add a dnf4 package, a libdnf5 package or a list_fd record"""
+        return self.add(*package_fields(pkg))
+
+    def add_records(self, records) -> range:
+        """add all packages from a dnf5daemon list/list_fd result, return the row ids"""
+        first = len(self.names)
+        for record in records:
+            self.add_record(record)
+        return range(first, len(self.names))
+
+
+def _column(name: str, nevra_part: bool = False, convert=None) -> property:
+    """property for a list column of the PackageTable
+
+    nevra_part: the column is part of the nevra, it is set with set_nevra_part()
+    convert: function to normalize the value set
+    """
+
+    def getter(self):
+        return getattr(self.table, name)[self.row]
+
+    def setter(self, value):
+        if convert:
+            value = convert(value)
+        if nevra_part:
+            self.table.set_nevra_part(name, self.row, value)
+        else:
+            getattr(self.table, name)[self.row] = value
+
+    return property(getter, setter)
+
+
+def _enum_column(name: str, enum_type: type[IntEnum]) -> property:
+    """property for an array column of the PackageTable holding an IntEnum"""
+
+    def getter(self):
+        return enum_type(getattr(self.table, name)[self.row])
+
+    def setter(self, value):
+        getattr(self.table, name)[self.row] = value
+
+    return property(getter, setter)
+
+
+def _bool_column(name: str) -> property:
+    """property for an array column of the PackageTable holding a bool"""
+
+    def getter(self):
+        return bool(getattr(self.table, name)[self.row])
+
+    def setter(self, value):
+        getattr(self.table, name)[self.row] = bool(value)
+
+    return property(getter, setter)
+
+
+class YumexPackage(GObject):
+    """View on a row in a PackageTable
+
+    YumexPackage(table=table, row=row) is a view on an existing row.
+    YumexPackage(name=..., arch=..., ...) and the from_* constructors without a
+    table make a StandalonePackage, that has the values itself.
+
+    evr, evr_key, nevra and id are made on first use and cached in the table
+    until the package changes. Packages are equal and hash the same when they
+    have the same nevra.
+    """
+
+    __slots__ = ("table", "row")
+
+    def __new__(cls, *args, **kwargs):
+        if cls is YumexPackage and kwargs.get("table") is None:
+            cls = StandalonePackage
+        return super().__new__(cls)
+
+    def __init__(self, *args, **kwargs):
+        super(YumexPackage, self).__init__()
+        table: PackageTable = kwargs.pop("table")
+        row = kwargs.pop("row", None)
+        self.table: PackageTable = table
+        if row is None:
+            row = table.add(**kwargs)
+        self.row: int = row
+
+    name: str = _column("names", nevra_part=True)
+    arch: str = _column("archs", nevra_part=True)
+    epoch: str = _column("epochs", nevra_part=True, convert=normalize_epoch)
+    release: str = _column("releases", nevra_part=True)
+    version: str = _column("versions", nevra_part=True)
+    description: str = _column("descriptions")
+    sizeB: int = _column("sizes")
+    state: PackageState = _enum_column("states", PackageState)
+    action: PackageAction = _enum_column("actions", PackageAction)
+    is_dep: bool = _bool_column("is_dep")
+    queued: bool = _bool_column("queued")
+    queue_action: bool = _bool_column("queue_action")
+
+    @property
+    def repo(self) -> str:
+        return self.table.repos[self.row]
+
+    @repo.setter
+    def repo(self, repo: str) -> None:
+        self.table.set_repo(self.row, repo)
+
+    @property
+    def ref_to(self) -> "YumexPackage":
+        return self.table.ref_to.get(self.row)
+
+    @ref_to.setter
+    def ref_to(self, pkg: "YumexPackage") -> None:
+        if pkg is None:
+            self.table.ref_to.pop(self.row, None)
+        else:
+            self.table.ref_to[self.row] = pkg
+
+    @classmethod
+    def from_dnf4(cls, pkg, table: PackageTable = None):
+        if table is None:
+            return StandalonePackage(*dnf4_fields(pkg))
+        return table.package(table.add_dnf4(pkg))
+
+    @classmethod
+    def from_dnf5(cls, pkg, table: PackageTable = None):
+        if table is None:
+            return StandalonePackage(*dnf5_fields(pkg))
+        return table.package(table.add_dnf5(pkg))
+
+    @classmethod
+    def from_record(cls, record: dict, table: PackageTable = None):
+        if table is None:
+            return StandalonePackage(*record_fields(record))
+        return table.package(table.add_record(record))
+
+    @property
+    def installed(self):
+        return self.state == PackageState.INSTALLED
+
+    def set_installed(self):
+        self.repo = f"@{self.repo}"
+        self.state = PackageState.INSTALLED
+
+    def set_update(self, inst_pkg):
+        self.ref_to = self.table.package(self.table.add_package(inst_pkg))
+        self.ref_to.state = PackageState.INSTALLED
+        self.state = PackageState.UPDATE
+
+    #     @property
+    #     def size(self):
+    #         return format_number(self.sizeB)
+
+    # @property
+    # def styles(self):
+    #     match self.state:
+    #         case PackageState.INSTALLED:
+    #             return ["success"]
+    #         case PackageState.UPDATE:
+    #             return ["error"]
+    #     return []
+
+    def _make_evr(self) -> str:
+        if self.epoch != "0":
+            return f"{self.epoch}:{self.version}-{self.release}"
+        return f"{self.version}-{self.release}"
+
+    @property
+    def evr(self):
+        evr = self.table.evrs[self.row]
+        if evr is None:
+            evr = self.table.evrs[self.row] = self._make_evr()
+        return evr
+
+    @property
+    def evr_key(self) -> tuple:
+        """sort key ordering packages by epoch, version and release like rpm
+
+        pkgs.sort(key=attrgetter("evr_key"))
+        """
+        key = self.table.evr_keys[self.row]
+        if key is None:
+            key = self.table.evr_keys[self.row] = evr_key(self.epoch, self.version, self.release)
+        return key
+
+    @property
+    def nevra(self):
+        nevra = self.table.nevras[self.row]
+        if nevra is None:
+            # the evr is not cached for it, most views only need the nevra
+            nevra = self.table.nevras[self.row] = f"{self.name}-{self._make_evr()}.{self.arch}"
+        return nevra
+
+    def __str__(self) -> str:
+        return f"YumexPackage({self.nevra} : {self.repo})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, YumexPackage):
+            return NotImplemented
+        return self.nevra == other.nevra
+
+    def __hash__(self) -> int:
+        return hash(self.nevra)
+
+    @property
+    def id(self):
+        pkg_id = self.table.ids[self.row]
+        if pkg_id is None:
+            nevra_r = (
+                self.name,
+                self.epoch,
+                self.version,
+                self.release,
+                self.arch,
+                self.repo[1:],
+            )
+            pkg_id = self.table.ids[self.row] = ",".join([str(elem) for elem in nevra_r])
+        return pkg_id
+
+
+def _key_column(name: str, keys: tuple[str]) -> property:
+    """property for a StandalonePackage value, keys are the cached keys made from it"""
+    slot = f"_{name}"
+
+    def getter(self):
+        return getattr(self, slot)
+
+    def setter(self, value):
+        setattr(self, slot, value)
+        for key in keys:
+            setattr(self, key, None)
+
+    return property(getter, setter)
+
+
+class StandalonePackage(YumexPackage):
+    """YumexPackage that is not in a PackageTable, it has the values in slots
+
+    Made for a single package, like YumexPackage(name=..., ...) or from_dnf4(pkg)
+    without a table. A table of its own would use many times the memory of the
+    package. table and row are None, the keys are cached in the package.
+    """
+
+    __slots__ = (
+        "_name",
+        "_arch",
+        "_epoch",
+        "_release",
+        "_version",
+        "_repo",
+        "description",
+        "sizeB",
+        "state",
+        "action",
+        "is_dep",
+        "queued",
+        "queue_action",
+        "ref_to",
+        "_evr",
+        "_evr_key",
+        "_nevra",
+        "_id",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        arch: str,
+        epoch: str,
+        release: str,
+        version: str,
+        repo: str,
+        description: str,
+        size: int,
+        state: PackageState = PackageState.AVAILABLE,
+        action: PackageAction = PackageAction.NONE,
+    ):
+        self.table = self.row = None
+        self._name = name
+        self._arch = arch
+        self._epoch = normalize_epoch(epoch)
+        self._release = sys.intern(release)
+        self._version = sys.intern(version)
+        self._repo = repo
+        self.description = description
+        self.sizeB = int(size)
+        self.state = PackageState(state)
+        self.action = PackageAction(action)
+        self.is_dep = self.queued = self.queue_action = False
+        self.ref_to = None
+        self._evr = self._evr_key = self._nevra = self._id = None
+
+    name: str = _key_column("name", ("_nevra", "_id"))
+    arch: str = _key_column("arch", ("_nevra", "_id"))
+    release: str = _key_column("release", ("_evr", "_evr_key", "_nevra", "_id"))
+    version: str = _key_column("version", ("_evr", "_evr_key", "_nevra", "_id"))
+    repo: str = _key_column("repo", ("_id",))
+
+    @property
+    def epoch(self) -> str:
+        return self._epoch
+
+    @epoch.setter
+    def epoch(self, epoch) -> None:
+        self._epoch = normalize_epoch(epoch)
+        self._evr = self._evr_key = self._nevra = self._id = None
+
+    def set_update(self, inst_pkg):
+        self.ref_to = StandalonePackage(*package_fields(inst_pkg))
+        self.ref_to.state = PackageState.INSTALLED
+        self.state = PackageState.UPDATE
+
+    @property
+    def evr(self):
+        if self._evr is None:
+            self._evr = self._make_evr()
+        return self._evr
+
+    @property
+    def evr_key(self) -> tuple:
+        if self._evr_key is None:
+            self._evr_key = evr_key(self.epoch, self.version, self.release)
+        return self._evr_key
+
+    @property
+    def nevra(self):
+        if self._nevra is None:
+            self._nevra = f"{self.name}-{self._make_evr()}.{self.arch}"
+        return self._nevra
+
+    @property
+    def id(self):
+        if self._id is None:
+            nevra_r = (self.name, self.epoch, self.version, self.release, self.arch, self.repo[1:])
+            self._id = ",".join([str(elem) for elem in nevra_r])
+        return self._id
+
+
+def _name_arch(pkg) -> tuple[str, str]:
+    """(name, arch) of a dnf4 package, a libdnf5 package or a list_fd record"""
+    if isinstance(pkg, dict):
+        if "name" in pkg:
+            return pkg["name"], pkg["arch"]
+        nevra = split_nevra(pkg.get("nevra") or pkg["full_nevra"])
+        return nevra.name, nevra.arch
+    if hasattr(pkg, "get_name"):
+        return pkg.get_name(), pkg.get_arch()
+    return pkg.name, pkg.arch
+
+
+def _package_evr_key(pkg) -> tuple:
+    """evr sort key of a dnf4 package, a libdnf5 package or a list_fd record"""
+    _, _, epoch, release, version = package_fields(pkg)[:5]
+    return evr_key(epoch, version, release)
+
+
+def pair_updates(upgrades, installed, table: PackageTable = None) -> list[YumexPackage]:
+    """make YumexPackages for upgrades and pair them with the installed packages
+
+    The installed packages are hashed on (name, arch) and the upgrades are joined
+    with them in a single pass, every upgrade gets the UPDATE state and a ref_to
+    the installed package it replaces, the newest one when several versions are
+    installed (installonly packages like kernel). Only the matched installed packages are
+    added to the table, a new table for the result when table is None.
+
+    upgrades and installed can be dnf4 packages, libdnf5 packages or list_fd records
+    """
+    if table is None:
+        table = PackageTable()
+    installed_by_key = {}
+    for pkg in installed:
+        key = _name_arch(pkg)
+        other = installed_by_key.get(key)
+        if other is None or _package_evr_key(pkg) > _package_evr_key(other):
+            installed_by_key[key] = pkg
+    result = []
+    for upgrade in upgrades:
+        pkg = table.package(table.add_package(upgrade))
+        inst_pkg = installed_by_key.get((pkg.name, pkg.arch))
+        if inst_pkg is not None:
+            pkg.set_update(inst_pkg)
+        else:
+            pkg.state = PackageState.UPDATE
+        result.append(pkg)
+    return result
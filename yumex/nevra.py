@@ -0,0 +1,80 @@
+"""
+Pure python NEVRA parsing
+
+Parses the name-[epoch:]version-release.arch strings returned by dnf4, libdnf5
+and dnf5daemon (nevra and full_nevra), without hawkey. The results are memoized
+in a bounded LRU cache, as the same strings are parsed again and again.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+CACHE_SIZE = 131072
+
+
+class NEVRA(NamedTuple):
+    name: str
+    epoch: str
+    version: str
+    release: str
+    arch: str
+
+
+class NEVR(NamedTuple):
+    name: str
+    epoch: str
+    version: str
+    release: str
+
+
+class NA(NamedTuple):
+    name: str
+    arch: str
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_nevr(nevr: str) -> NEVR:
+    """split name-[epoch:]version-release, epoch is "" when not in the string"""
+    rest, _, release = nevr.rpartition("-")
+    name, _, version = rest.rpartition("-")
+    epoch, sep, version_only = version.partition(":")
+    if sep:
+        version = version_only
+    else:
+        epoch = ""
+    if not name or not version or not release:
+        raise ValueError(f"Not a valid NEVR: {nevr}")
+    return NEVR(name, epoch, version, release)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_nevra(nevra: str) -> NEVRA:
+    """split name-[epoch:]version-release.arch, epoch is "" when not in the string"""
+    nevr, sep, arch = nevra.rpartition(".")
+    if not sep or not arch or nevr.count("-") < 2:
+        raise ValueError(f"Not a valid NEVRA: {nevra}")
+    return NEVRA(*split_nevr(nevr), arch)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_na(na: str) -> NA:
+    """split name.arch"""
+    name, _, arch = na.rpartition(".")
+    if not name or not arch:
+        raise ValueError(f"Not a valid NA: {na}")
+    return NA(name, arch)
+
+
+def split_nevra_column(nevras) -> tuple[list[str], list[str], list[str], list[str], list[str]]:
+    """split a column of nevra strings in one call
+
+    return the name, epoch, version, release and arch columns
+    """
+    names, epochs, versions, releases, archs = [], [], [], [], []
+    for name, epoch, version, release, arch in map(split_nevra, nevras):
+        names.append(name)
+        epochs.append(epoch)
+        versions.append(version)
+        releases.append(release)
+        archs.append(arch)
+    return names, epochs, versions, releases, archs
@@ -0,0 +1,177 @@
+"""
+Pure python rpm version comparison
+
+version_key() turns a version or release string into a tuple, that sorts the
+same way as rpmvercmp() from rpm compares the strings, so a list can be sorted
+by version with a single sort(key=...), without parsing in every comparison.
+The keys are memoized, as the same versions are seen again and again.
+"""
+
+import re
+from functools import lru_cache
+
+# the parts of a version, everything else is a separator
+SEGMENT_RE = re.compile(r"[0-9]+|[a-zA-Z]+|~|\^")
+
+# the parts of the key are ordered as: ~ < end of version < ^ < alpha < numeric
+TILDE = (0,)
+END = (1,)
+CARET = (2,)
+ALPHA = 3
+NUMERIC = 4
+
+
+@lru_cache(maxsize=65536)
+def version_key(version: str) -> tuple:
+    """make a sort key for a version or release string"""
+    key = []
+    for segment in SEGMENT_RE.findall(version):
+        if segment == "~":
+            key.append(TILDE)
+        elif segment == "^":
+            key.append(CARET)
+        elif segment[0].isdigit():
+            # numeric segments compare by value, the longer one (without leading zeros) is newer
+            segment = segment.lstrip("0")
+            key.append((NUMERIC, len(segment), segment))
+        else:
+            key.append((ALPHA, segment))
+    key.append(END)
+    return tuple(key)
+
+
+@lru_cache(maxsize=65536)
+def evr_key(epoch, version: str, release: str) -> tuple:
+    """make a sort key for an epoch, version and release"""
+    return int(epoch or 0), version_key(version), version_key(release)
+
+
+def rpmvercmp(one: str, two: str) -> int:
+    """compare two version strings like rpm, return 1, 0 or -1"""
+    if one == two:
+        return 0
+    key_one = version_key(one)
+    key_two = version_key(two)
+    return (key_one > key_two) - (key_one < key_two)
+
+
+def split_evr(evr: str) -> tuple[str, str, str]:
+    """split a [epoch:]version[-release] string"""
+    epoch, sep, version = evr.partition(":")
+    if not sep:
+        epoch, version = "", evr
+    version, _, release = version.partition("-")
+    return epoch, version, release
+
+
+def evrcmp(one: str, two: str) -> int:
+    """compare two [epoch:]version[-release] strings like rpm, return 1, 0 or -1"""
+    key_one = evr_key(*split_evr(one))
+    key_two = evr_key(*split_evr(two))
+    return (key_one > key_two) - (key_one < key_two)
+
+
+# test vectors from rpm (tests/rpmvercmp.at)
+RPM_TEST_VECTORS = [
+    ("1.0", "1.0", 0),
+    ("1.0", "2.0", -1),
+    ("2.0", "1.0", 1),
+    ("2.0.1", "2.0.1", 0),
+    ("2.0", "2.0.1", -1),
+    ("2.0.1", "2.0", 1),
+    ("2.0.1a", "2.0.1a", 0),
+    ("2.0.1a", "2.0.1", 1),
+    ("2.0.1", "2.0.1a", -1),
+    ("5.5p1", "5.5p1", 0),
+    ("5.5p1", "5.5p2", -1),
+    ("5.5p2", "5.5p1", 1),
+    ("5.5p10", "5.5p10", 0),
+    ("5.5p1", "5.5p10", -1),
+    ("5.5p10", "5.5p1", 1),
+    ("10xyz", "10.1xyz", -1),
+    ("10.1xyz", "10xyz", 1),
+    ("xyz10", "xyz10", 0),
+    ("xyz10", "xyz10.1", -1),
+    ("xyz10.1", "xyz10", 1),
+    ("xyz.4", "xyz.4", 0),
+    ("xyz.4", "8", -1),
+    ("8", "xyz.4", 1),
+    ("xyz.4", "2", -1),
+    ("2", "xyz.4", 1),
+    ("5.5p2", "5.6p1", -1),
+    ("5.6p1", "5.5p2", 1),
+    ("5.6p1", "6.5p1", -1),
+    ("6.5p1", "5.6p1", 1),
+    ("6.0.rc1", "6.0", 1),
+    ("6.0", "6.0.rc1", -1),
+    ("10b2", "10a1", 1),
+    ("10a2", "10b2", -1),
+    ("1.0aa", "1.0aa", 0),
+    ("1.0a", "1.0aa", -1),
+    ("1.0aa", "1.0a", 1),
+    ("10.0001", "10.0001", 0),
+    ("10.0001", "10.1", 0),
+    ("10.1", "10.0001", 0),
+    ("10.0001", "10.0039", -1),
+    ("10.0039", "10.0001", 1),
+    ("4.999.9", "5.0", -1),
+    ("5.0", "4.999.9", 1),
+    ("20101121", "20101121", 0),
+    ("20101121", "20101122", -1),
+    ("20101122", "20101121", 1),
+    ("2_0", "2_0", 0),
+    ("2.0", "2_0", 0),
+    ("2_0", "2.0", 0),
+    ("a", "a", 0),
+    ("a+", "a+", 0),
+    ("a+", "a_", 0),
+    ("a_", "a+", 0),
+    ("+a", "+a", 0),
+    ("+a", "_a", 0),
+    ("_a", "+a", 0),
+    ("+_", "+_", 0),
+    ("_+", "+_", 0),
+    ("_+", "_+", 0),
+    ("+", "_", 0),
+    ("_", "+", 0),
+    ("1.0~rc1", "1.0~rc1", 0),
+    ("1.0~rc1", "1.0", -1),
+    ("1.0", "1.0~rc1", 1),
+    ("1.0~rc1", "1.0~rc2", -1),
+    ("1.0~rc2", "1.0~rc1", 1),
+    ("1.0~rc1~git123", "1.0~rc1~git123", 0),
+    ("1.0~rc1~git123", "1.0~rc1", -1),
+    ("1.0~rc1", "1.0~rc1~git123", 1),
+    ("1.0^", "1.0^", 0),
+    ("1.0^", "1.0", 1),
+    ("1.0", "1.0^", -1),
+    ("1.0^git1", "1.0^git1", 0),
+    ("1.0^git1", "1.0", 1),
+    ("1.0", "1.0^git1", -1),
+    ("1.0^git1", "1.0^git2", -1),
+    ("1.0^git2", "1.0^git1", 1),
+    ("1.0^git1", "1.01", -1),
+    ("1.01", "1.0^git1", 1),
+    ("1.0^20160101", "1.0^20160101", 0),
+    ("1.0^20160101", "1.0.1", -1),
+    ("1.0.1", "1.0^20160101", 1),
+    ("1.0^20160101^git1", "1.0^20160101^git1", 0),
+    ("1.0^20160102", "1.0^20160101^git1", 1),
+    ("1.0^20160101^git1", "1.0^20160102", -1),
+    ("1.0~rc1^git1", "1.0~rc1^git1", 0),
+    ("1.0~rc1^git1", "1.0~rc1", 1),
+    ("1.0~rc1", "1.0~rc1^git1", -1),
+    ("1.0^git1~pre", "1.0^git1~pre", 0),
+    ("1.0^git1", "1.0^git1~pre", 1),
+    ("1.0^git1~pre", "1.0^git1", -1),
+]
+
+
+if __name__ == "__main__":
+    failed = 0
+    for one, two, expected in RPM_TEST_VECTORS:
+        result = rpmvercmp(one, two)
+        if result != expected:
+            failed += 1
+            print(f"FAILED: rpmvercmp({one!r}, {two!r}) = {result}, expected {expected}")
+    print(f"{len(RPM_TEST_VECTORS) - failed} of {len(RPM_TEST_VECTORS)} rpm test vectors passed")